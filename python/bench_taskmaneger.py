@@ -0,0 +1,239 @@
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager, redirect_stdout
+from unittest import mock
+
+import taskmaneger
+
+STATUSES = ["running", "sleeping", "sleeping", "sleeping", "idle", "disk-sleep", "stopped"]
+USERS = ["root", "svc", "www-data", "postgres", "nobody"]
+NAMES = ["python", "java", "nginx", "postgres", "bash", "sshd", "node", "worker", "systemd", "chrome"]
+
+class FakeMemoryInfo:
+    __slots__ = ("rss",)
+
+    def __init__(self, rss):
+        self.rss = rss
+
+class FakeProcess:
+    """Stand-in for psutil.Process backed by a synthetic process table."""
+
+    table = {}  # pid -> dict of attributes
+
+    def __init__(self, pid):
+        if pid not in self.table:
+            raise taskmaneger.psutil.NoSuchProcess(pid)
+        self.pid = pid
+        self._info = self.table[pid]
+
+    @contextmanager
+    def oneshot(self):
+        yield
+
+    def as_dict(self, attrs):
+        return {attr: self._info[attr] for attr in attrs}
+
+    def status(self):
+        return self._info["status"]
+
+    def memory_info(self):
+        return FakeMemoryInfo(self._info["rss"])
+
+    def cpu_percent(self):
+        return self._info["cpu_percent"]
+
+    def ppid(self):
+        return self._info["ppid"]
+
+def make_process(pid, rng):
+    return {
+        "pid": pid,
+        "name": f"{rng.choice(NAMES)}-{pid % 97}",
+        "username": rng.choice(USERS),
+        "status": rng.choice(STATUSES),
+        "rss": rng.randint(1, 4096) * 1024 * 1024,
+        "cpu_percent": round(rng.random() * 100, 1) if rng.random() < 0.1 else 0.0,
+        "create_time": 1.7e9 + pid,
+        "ppid": rng.randint(1, max(pid - 1, 1)),
+    }
+
+def build_table(size, seed=0):
+    """Create a synthetic process table with size entries."""
+    rng = random.Random(seed)
+    return {pid: make_process(pid, rng) for pid in range(1, size + 1)}
+
+def churn_table(table, fraction, rng):
+    """Replace a fraction of processes and perturb the rest like a busy host would."""
+    for pid in rng.sample(list(table), int(len(table) * fraction)):
+        del table[pid]
+        new_pid = max(table) + 1
+        table[new_pid] = make_process(new_pid, rng)
+    for info in rng.sample(list(table.values()), len(table) // 10):
+        info["rss"] += rng.randint(-64, 64) * 4096
+        info["cpu_percent"] = round(rng.random() * 100, 1)
+
+@contextmanager
+def synthetic_psutil(table):
+    """Point the psutil snapshot backend at a synthetic process table."""
+    FakeProcess.table = table
+    with mock.patch.object(taskmaneger.psutil, "pids", lambda: list(table)), \
+            mock.patch.object(taskmaneger.psutil, "Process", FakeProcess):
+        yield
+
+def measure(stage, items, function):
+    """Time one stage, then re-run it under tracemalloc for its peak memory."""
+    start = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, {
+        "stage": stage,
+        "items": items,
+        "seconds": round(elapsed, 6),
+        "items_per_second": round(items / elapsed) if elapsed else None,
+        "peak_bytes": peak,
+    }
+
+def run_suite(size, seed=0):
+    """Benchmark snapshot, filter, sort, render and export for one table size."""
+    table = build_table(size, seed)
+    rng = random.Random(seed + 1)
+    results = []
+    with synthetic_psutil(table):
+        snapshot = taskmaneger.ProcessSnapshot()
+        records, stats = measure("snapshot_cold", size, lambda: taskmaneger.ProcessSnapshot().refresh())
+        results.append(stats)
+        snapshot.refresh()
+        churn_table(table, 0.01, rng)
+        records, stats = measure("snapshot_warm", len(table), snapshot.refresh)
+        results.append(stats)
+
+    expression = "name~^(py|ja) user!=nobody rss>100M cpu>=1"
+    predicate = taskmaneger.compile_filter(expression)
+    _, stats = measure("filter", len(records), lambda: [r for r in records if predicate(r)])
+    results.append(stats)
+    for sort_by in taskmaneger.SORT_KEYS:
+        _, stats = measure(f"sort_{sort_by}", len(records),
+                           lambda: taskmaneger.sort_processes(list(records), sort_by))
+        results.append(stats)
+    _, stats = measure("render_viewport", 50, lambda: taskmaneger.format_process_entries(records, 50))
+    results.append(stats)
+    _, stats = measure("render_all", len(records), lambda: taskmaneger.format_process_entries(records))
+    results.append(stats)
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            with redirect_stdout(io.StringIO()):
+                # Exports are timestamped per second; remove the file so both runs write fresh
+                def export():
+                    taskmaneger.export_to_csv(records)
+                    for name in os.listdir(directory):
+                        os.remove(name)
+                _, stats = measure("export_csv", len(records), export)
+                results.append(stats)
+                rows = lambda: taskmaneger.iter_snapshot_rows(records, 0.0)
+                _, stats = measure("export_ndjson_gz", len(records),
+                                   lambda: taskmaneger.export_records(rows(), "stream.ndjson.gz", "ndjson"))
+        finally:
+            os.chdir(cwd)
+    results.append(stats)
+    return results
+
+def print_results(size, results, baseline=None):
+    print(f"\n{taskmaneger.BOLD}{taskmaneger.BLUE}=== {size} processes ==={taskmaneger.RESET}")
+    previous = {entry["stage"]: entry for entry in (baseline or [])}
+    for entry in results:
+        line = (f"{entry['stage']:<16} {entry['seconds'] * 1000:>10.2f} ms "
+                f"{entry['items_per_second'] or 0:>12,} items/s {entry['peak_bytes'] / 1024:>10.0f} KB peak")
+        old = previous.get(entry["stage"])
+        if old and old["seconds"]:
+            change = (entry["seconds"] - old["seconds"]) / old["seconds"] * 100
+            color = taskmaneger.RED if change > 10 else taskmaneger.GREEN
+            line += f"  {color}{change:+.1f}%{taskmaneger.RESET}"
+        print(line)
+
+def spawn_sleepers(count):
+    """Start idle child processes so the live benchmark has a realistic process count."""
+    return [subprocess.Popen(["sleep", "600"]) for _ in range(count)]
+
+def time_refreshes(snapshot, rounds):
+    """Return (cold, warm average) refresh times in seconds for a snapshot backend."""
+    start = time.perf_counter()
+    snapshot.refresh()
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(rounds):
+        snapshot.refresh()
+    warm = (time.perf_counter() - start) / rounds
+    return cold, warm
+
+def run_live(rounds, spawn):
+    """Compare the psutil and /proc backends on the real process table."""
+    children = spawn_sleepers(spawn)
+    try:
+        backends = [("psutil", taskmaneger.ProcessSnapshot())]
+        if sys.platform.startswith("linux"):
+            backends.append(("procfs", taskmaneger.ProcfsSnapshot()))
+        results = {}
+        for name, snapshot in backends:
+            cold, warm = time_refreshes(snapshot, rounds)
+            results[name] = warm
+            print(f"{name:<8} processes={len(snapshot):<7} cold={cold * 1000:8.1f} ms  warm={warm * 1000:8.1f} ms")
+        if "procfs" in results:
+            print(f"procfs speedup (warm): {results['psutil'] / results['procfs']:.1f}x")
+    finally:
+        for child in children:
+            child.kill()
+        for child in children:
+            child.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the process manager.")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Comma-separated synthetic table sizes")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic process tables")
+    parser.add_argument("--output", default=None, help="Save results as JSON for later comparison")
+    parser.add_argument("--compare", default=None, help="JSON results of an earlier run to compare against")
+    parser.add_argument("--live", action="store_true", help="Compare snapshot backends on the real process table instead")
+    parser.add_argument("--rounds", type=int, default=5, help="Warm refreshes to average with --live")
+    parser.add_argument("--spawn", type=int, default=0, help="Idle processes to start before measuring with --live")
+    args = parser.parse_args()
+
+    if args.live:
+        run_live(args.rounds, args.spawn)
+        return
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)["results"]
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.time(),
+        "results": {},
+    }
+    for size in (int(size) for size in args.sizes.split(",")):
+        results = run_suite(size, args.seed)
+        report["results"][str(size)] = results
+        print_results(size, results, baseline.get(str(size)))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"\n{taskmaneger.GREEN}Results saved to {args.output}.{taskmaneger.RESET}")
+
+if __name__ == "__main__":
+    main()
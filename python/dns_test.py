@@ -0,0 +1,167 @@
+import socket
+import struct
+import threading
+import time
+import unittest
+
+import networkTools as nt
+
+
+class StubDnsServer:
+    """Authoritative-looking DNS server on 127.0.0.1 answering from a small zone over UDP and TCP."""
+
+    def __init__(self, zone, truncate=(), delay=0.0):
+        self.zone = zone  # (name, qtype) -> (ttl, [rdata bytes])
+        self.truncate = set(truncate)  # Names whose UDP answers are sent truncated
+        self.delay = delay
+        self.udp_queries = 0
+        self.tcp_queries = 0
+        self.outstanding = 0
+        self.max_outstanding = 0
+        self.lock = threading.Lock()
+        self.udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.udp.bind(("127.0.0.1", 0))
+        self.port = self.udp.getsockname()[1]
+        self.tcp = socket.socket()
+        self.tcp.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.tcp.bind(("127.0.0.1", self.port))
+        self.tcp.listen(16)
+        for target in (self._serve_udp, self._serve_tcp):
+            threading.Thread(target=target, daemon=True).start()
+
+    def close(self):
+        self.udp.close()
+        self.tcp.close()
+
+    def answer(self, query, truncated=False):
+        query_id, = struct.unpack_from("!H", query)
+        name, offset = nt.read_dns_name(query, 12)
+        qtype, = struct.unpack_from("!H", query, offset)
+        question = query[12:offset + 4]
+        answers, authority, rcode = [], [], 0
+        if (name, qtype) in self.zone and not truncated:
+            ttl, rdatas = self.zone[(name, qtype)]
+            answers = [b"\xc0\x0c" + struct.pack("!HHIH", qtype, 1, ttl, len(rdata)) + rdata for rdata in rdatas]
+        elif not any(key[0] == name for key in self.zone):
+            rcode = 3
+            soa = (nt.encode_dns_name("ns.test") + nt.encode_dns_name("admin.test")
+                   + struct.pack("!IIIII", 1, 3600, 600, 86400, 30))
+            authority = [nt.encode_dns_name("test") + struct.pack("!HHIH", 6, 1, 300, len(soa)) + soa]
+        flags = 0x8180 | rcode | (0x0200 if truncated else 0)
+        return (struct.pack("!HHHHHH", query_id, flags, 1, len(answers), len(authority), 0)
+                + question + b"".join(answers) + b"".join(authority))
+
+    def _reply_udp(self, query, address):
+        time.sleep(self.delay)
+        try:
+            name = nt.read_dns_name(query, 12)[0]
+            self.udp.sendto(self.answer(query, truncated=name in self.truncate), address)
+        except OSError:
+            pass
+        with self.lock:
+            self.outstanding -= 1
+
+    def _serve_udp(self):
+        while True:
+            try:
+                query, address = self.udp.recvfrom(4096)
+            except OSError:
+                return
+            with self.lock:
+                self.udp_queries += 1
+                self.outstanding += 1
+                self.max_outstanding = max(self.max_outstanding, self.outstanding)
+            threading.Thread(target=self._reply_udp, args=(query, address), daemon=True).start()
+
+    def _serve_tcp(self):
+        while True:
+            try:
+                connection, _ = self.tcp.accept()
+            except OSError:
+                return
+            with connection:
+                length, = struct.unpack("!H", connection.recv(2))
+                query = connection.recv(length)
+                self.tcp_queries += 1
+                response = self.answer(query)
+                connection.sendall(struct.pack("!H", len(response)) + response)
+
+
+def a_record(address):
+    return socket.inet_aton(address)
+
+
+class DnsResolverTest(unittest.TestCase):
+    def setUp(self):
+        self.server = StubDnsServer({
+            ("example.test", 1): (300, [a_record("10.0.0.1")]),
+            ("example.test", 28): (300, [socket.inet_pton(socket.AF_INET6, "2001:db8::1")]),
+            ("example.test", 15): (300, [struct.pack("!H", 10) + nt.encode_dns_name("mail.example.test")]),
+            ("big.test", 1): (300, [a_record(f"10.1.0.{i}") for i in range(60)]),
+            ("short.test", 1): (1, [a_record("10.2.0.1")]),
+            ("xn--bcher-kva.test", 1): (300, [a_record("10.3.0.1")]),
+        }, truncate={"big.test"})
+        self.resolver = nt.DnsResolver(["127.0.0.1"], port=self.server.port, timeout=1.0, attempts=1)
+
+    def tearDown(self):
+        self.resolver.close()
+        self.server.close()
+
+    def test_parallel_types_share_one_socket(self):
+        answers = self.resolver.run(self.resolver.resolve("example.test", ("A", "AAAA", "MX", "NS")))
+        self.assertEqual([a.records[0].value for a in answers[:3]], ["10.0.0.1", "2001:db8::1", "10 mail.example.test"])
+        self.assertEqual(answers[3].status, "NOERROR")
+        self.assertEqual(answers[3].records, [])
+
+    def test_truncated_answer_is_retried_over_tcp(self):
+        answer = self.resolver.run(self.resolver.query("big.test"))
+        self.assertEqual(answer.status, "NOERROR")
+        self.assertEqual(len(answer.records), 60)
+        self.assertEqual(self.server.tcp_queries, 1)
+
+    def test_answers_are_cached_until_their_ttl_expires(self):
+        first = self.resolver.run(self.resolver.query("short.test"))
+        second = self.resolver.run(self.resolver.query("short.test"))
+        self.assertFalse(first.cached)
+        self.assertTrue(second.cached)
+        self.assertEqual(self.server.udp_queries, 1)
+        time.sleep(1.1)
+        third = self.resolver.run(self.resolver.query("short.test"))
+        self.assertFalse(third.cached)
+        self.assertEqual(self.server.udp_queries, 2)
+
+    def test_nxdomain_is_cached_for_the_soa_minimum(self):
+        first = self.resolver.run(self.resolver.query("missing.test"))
+        second = self.resolver.run(self.resolver.query("missing.test"))
+        self.assertEqual((first.status, second.status), ("NXDOMAIN", "NXDOMAIN"))
+        self.assertTrue(second.cached)
+        self.assertEqual(self.server.udp_queries, 1)
+        stored, expires = self.resolver.cache.entries[("missing.test", 1)][:2]
+        self.assertAlmostEqual(expires - stored, 30)
+
+    def test_idn_names_are_queried_in_ascii_form(self):
+        answer = self.resolver.run(self.resolver.query("bücher.test"))
+        self.assertEqual(answer.status, "NOERROR")
+        self.assertEqual(answer.name, "xn--bcher-kva.test")
+        self.assertEqual(answer.records[0].value, "10.3.0.1")
+
+    def test_resolve_many_caps_queries_in_flight(self):
+        self.server.zone.update({(f"host{i}.test", 1): (300, [a_record("10.4.0.1")]) for i in range(100)})
+        self.server.delay = 0.02
+        answers = []
+        count = self.resolver.run(self.resolver.resolve_many(
+            (f"host{i}.test" for i in range(100)), ("A",), limit=10,
+            on_answer=lambda name, answer: answers.append(answer.status)))
+        self.assertEqual(count, 100)
+        self.assertEqual(set(answers), {"NOERROR"})
+        self.assertLessEqual(self.server.max_outstanding, 10)
+        self.assertGreater(self.server.max_outstanding, 1)
+
+    def test_timeout_is_reported(self):
+        self.server.delay = 1.5
+        answer = self.resolver.run(self.resolver.query("example.test"))
+        self.assertEqual(answer.status, "timeout")
+
+
+if __name__ == "__main__":
+    unittest.main()
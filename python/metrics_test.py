@@ -0,0 +1,78 @@
+import threading
+import time
+import unittest
+import urllib.error
+import urllib.request
+from unittest import mock
+
+import taskmaneger
+
+
+class MetricsServerTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # A long interval keeps the sampler from publishing again while the tests run
+        cls.server = taskmaneger.start_metrics_server(port=0, interval=3600, top_n=3)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        host, port = cls.server.server_address[:2]
+        cls.url = f"http://{host}:{port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.server.sampler.stop()
+
+    def scrape(self, path="/metrics"):
+        with urllib.request.urlopen(self.url + path, timeout=5) as response:
+            return response.headers["Content-Type"], response.read().decode()
+
+    def test_scrape_serves_the_cached_payload_without_psutil(self):
+        counting = mock.MagicMock(wraps=taskmaneger.psutil)
+        with mock.patch.object(taskmaneger, "psutil", counting):
+            content_type, first = self.scrape()
+            _, second = self.scrape()
+        self.assertEqual(counting.mock_calls, [])
+        self.assertTrue(content_type.startswith("text/plain; version=0.0.4"))
+        self.assertEqual(first, second)
+        self.assertIn("# TYPE taskmanager_cpu_percent gauge", first)
+
+    def test_per_process_series_are_capped_at_top_n(self):
+        _, text = self.scrape()
+        lines = text.splitlines()
+        processes = next(float(line.split()[1]) for line in lines if line.startswith("taskmanager_processes "))
+        for metric in ("taskmanager_process_cpu_percent{", "taskmanager_process_resident_bytes{"):
+            series = [line for line in lines if line.startswith(metric)]
+            self.assertEqual(len(series), min(3, processes), metric)
+
+    def test_other_paths_are_not_found(self):
+        with self.assertRaises(urllib.error.HTTPError) as raised:
+            self.scrape("/")
+        self.assertEqual(raised.exception.code, 404)
+
+
+class MetricsSamplerTest(unittest.TestCase):
+    def test_failing_listener_does_not_stop_sampling(self):
+        sampler = taskmaneger.MetricsSampler(interval=0.05)
+        calls = []
+
+        def full_disk(snapshot):
+            calls.append(snapshot)
+            if len(calls) == 1:
+                raise OSError(28, "No space left on device")
+
+        sampler.snapshot.listeners.append(full_disk)
+        with self.assertLogs("taskmaneger.metrics", "ERROR"):
+            sampler.start()
+            deadline = time.monotonic() + 5
+            while not sampler.payload and time.monotonic() < deadline:
+                time.sleep(0.01)
+        sampler.stop()
+        sampler.join(5)
+        self.assertGreaterEqual(len(calls), 2)
+        self.assertIn(b"taskmanager_processes ", sampler.payload)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,31 @@
 import os
+import sys
+import time
+import math
+import shlex
+import random
+import socket
+import struct
+import asyncio
+import sqlite3
+import difflib
+import ipaddress
+from collections import OrderedDict, deque
+from operator import attrgetter
 import subprocess
 import logging
-import speedtest  # For network speed test
+
+try:
+    from procnet import SOCKET_TABLES, TCP_STATES, decode_proc_address, read_table
+except ImportError:
+    # The copy at the repository root shares python/procnet.py with taskmaneger.py
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "python"))
+    from procnet import SOCKET_TABLES, TCP_STATES, decode_proc_address, read_table
+
+try:
+    import speedtest  # For network speed test; optional
+except ImportError:
+    speedtest = None
 
 # ANSI codes for custom color
 RESET = '\033[0m'
@@ -15,8 +39,40 @@ BRIGHT_GREEN = '\033[92m'
 BRIGHT_RED = '\033[91m'
 BRIGHT_CYAN = '\033[96m'
 
-# Command history
-command_history = []
+# Command history database (shared across sessions)
+HISTORY_PATH = os.environ.get("NETWORK_TOOLS_HISTORY", os.path.join(os.path.expanduser("~"), ".network_tools_history.db"))
+HISTORY_FUZZY_CANDIDATES = 2000  # newest trigram matches ranked by a fuzzy search
+
+# Command runner limits
+MAX_CONCURRENT_COMMANDS = 4
+COMMAND_TIMEOUT = 120  # seconds
+OUTPUT_CHUNK_SIZE = 65536  # bytes read from a command's pipe at a time
+
+# Reachability sweeper defaults
+MAX_CONCURRENT_PROBES = 256
+TCP_PROBE_PORT = 443
+
+# DNS resolver settings
+DNS_TYPES = {"A": 1, "NS": 2, "CNAME": 5, "SOA": 6, "PTR": 12, "MX": 15, "AAAA": 28}
+DNS_TYPE_NAMES = {number: name for name, number in DNS_TYPES.items()}
+DNS_RCODES = {0: "NOERROR", 1: "FORMERR", 2: "SERVFAIL", 3: "NXDOMAIN", 4: "NOTIMP", 5: "REFUSED"}
+DNS_TIMEOUT = 2.0  # seconds per attempt
+DNS_CACHE_SIZE = 10000
+DNS_NEGATIVE_TTL = 60  # seconds, when the server sends no SOA
+MAX_DNS_IN_FLIGHT = 500
+
+# /proc/net tables (Linux)
+PROC_NET = "/proc/net"
+UDP_STATES = {"07": "UNCONN", "01": "ESTABLISHED"}
+ROUTE_FLAGS = ((0x0001, "U"), (0x0002, "G"), (0x0004, "H"), (0x0010, "D"), (0x0020, "M"), (0x0200, "!"))
+ARP_FLAGS = ((0x02, "C"), (0x04, "M"), (0x08, "P"))
+WATCH_INTERVAL = 0.5  # seconds between connection table polls
+WATCH_MAX_EVENTS = 20  # event lines printed per poll
+
+# Troubleshooting wizard
+WIZARD_CHECK_TIMEOUT = 10  # seconds per check
+WIZARD_DNS_NAME = "example.com"
+WIZARD_EXTERNAL_HOSTS = ("1.1.1.1", "8.8.8.8")
 
 # Logging setup
 logging.basicConfig(filename="network_tools.log", level=logging.INFO, format="%(asctime)s - %(message)s")
@@ -29,17 +85,1096 @@ def pause():
     """Pause the script and wait for user input to continue."""
     input(f"{BRIGHT_YELLOW}Press Enter to continue...{RESET}")
 
-def execute_command(command, success_message=None):
-    """Execute a system command and log the result."""
-    command_history.append(command)
+class CommandHistory:
+    """Append-only command history in SQLite with a trigram full-text index.
+
+    The database is opened on first use, so starting the program costs
+    nothing however long the history has grown.
+    """
+
+    def __init__(self, path=HISTORY_PATH):
+        self.path = path
+        self.db = None
+        self.indexed = False  # False when this SQLite lacks FTS5 trigram support
+
+    def _connect(self):
+        if self.db is not None:
+            return self.db
+        try:
+            self.db = sqlite3.connect(self.path, isolation_level=None)
+            self.db.execute("PRAGMA journal_mode=WAL")
+        except sqlite3.Error as e:
+            logging.error(f"Cannot open history database {self.path}: {e}")
+            self.db = sqlite3.connect(":memory:", isolation_level=None)
+        self.db.execute("""CREATE TABLE IF NOT EXISTS history (
+            id INTEGER PRIMARY KEY, command TEXT NOT NULL, started REAL NOT NULL,
+            duration REAL, exit_status INTEGER)""")
+        try:
+            self.db.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS history_index USING fts5(
+                command, content='history', content_rowid='id', tokenize='trigram')""")
+            self.db.execute("""CREATE TRIGGER IF NOT EXISTS history_indexed AFTER INSERT ON history BEGIN
+                INSERT INTO history_index(rowid, command) VALUES (new.id, new.command); END""")
+            self.indexed = True
+        except sqlite3.OperationalError:
+            self.indexed = False
+        return self.db
+
+    def append(self, command, duration=None, exit_status=None, started=None):
+        """Record one command; started defaults to now minus its duration."""
+        if started is None:
+            started = time.time() - (duration or 0)
+        self._connect().execute("INSERT INTO history (command, started, duration, exit_status) VALUES (?, ?, ?, ?)",
+                                (command, started, duration, exit_status))
+
+    def __len__(self):
+        return self._connect().execute("SELECT count(*) FROM history").fetchone()[0]
+
+    def recent(self, limit=20):
+        """Return the newest entries as (command, started, duration, exit_status) rows."""
+        return self._connect().execute("SELECT command, started, duration, exit_status FROM history "
+                                       "ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+
+    def search(self, term, limit=50):
+        """Return the newest entries containing term, case-insensitively."""
+        db = self._connect()
+        if self.indexed and len(term) >= 3:
+            # A quoted trigram phrase matches the term as a substring (newest-first, see fuzzy_search)
+            return db.execute("SELECT h.command, h.started, h.duration, h.exit_status FROM history_index "
+                              "JOIN history h ON h.id = history_index.rowid WHERE history_index MATCH ? "
+                              "ORDER BY history_index.rowid DESC LIMIT ?", ('"' + term.replace('"', '""') + '"', limit)).fetchall()
+        pattern = "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        return db.execute("SELECT command, started, duration, exit_status FROM history "
+                          "WHERE command LIKE ? ESCAPE '\\' ORDER BY id DESC LIMIT ?", (pattern, limit)).fetchall()
+
+    def fuzzy_search(self, term, limit=20):
+        """Return entries resembling term, best match first, tolerating typos and reordering."""
+        db = self._connect()
+        term = term.lower()
+        trigrams = {term[i:i + 3] for i in range(len(term) - 2)}
+        if self.indexed and trigrams:
+            # Any shared trigram makes a candidate; the ranking below sorts out the rest.
+            # Ordering on the index's own rowid lets FTS5 walk newest-first and stop early.
+            query = " OR ".join('"' + t.replace('"', '""') + '"' for t in trigrams)
+            rows = db.execute("SELECT h.command, h.started, h.duration, h.exit_status FROM history_index "
+                              "JOIN history h ON h.id = history_index.rowid WHERE history_index MATCH ? "
+                              "ORDER BY history_index.rowid DESC LIMIT ?", (query, HISTORY_FUZZY_CANDIDATES)).fetchall()
+        else:
+            rows = db.execute("SELECT command, started, duration, exit_status FROM history "
+                              "ORDER BY id DESC LIMIT ?", (HISTORY_FUZZY_CANDIDATES,)).fetchall()
+        best = {}
+        for row in rows:
+            command = row[0]
+            if command not in best:
+                best[command] = (difflib.SequenceMatcher(None, term, command.lower()).ratio(), row)
+        ranked = sorted(best.values(), key=lambda item: -item[0])
+        return [row for score, row in ranked[:limit] if score >= 0.3]
+
+command_history = CommandHistory()
+
+class CommandResult:
+    """Outcome of one command run by run_command."""
+
+    __slots__ = ("command", "returncode", "stdout", "stderr", "stdout_bytes", "stderr_bytes",
+                 "duration", "timed_out", "error")
+
+    def __init__(self, command):
+        self.command = command
+        self.returncode = None
+        self.stdout = ""
+        self.stderr = ""
+        self.stdout_bytes = 0
+        self.stderr_bytes = 0
+        self.duration = 0.0
+        self.timed_out = False
+        self.error = None
+
+    @property
+    def ok(self):
+        return self.returncode == 0 and not self.timed_out and self.error is None
+
+    def describe(self):
+        """Return a one-line summary of how the command ended."""
+        if self.error:
+            status = self.error
+        elif self.timed_out:
+            status = "timed out"
+        else:
+            status = f"exit code {self.returncode}"
+        return (f"{self.command}: {status} in {self.duration:.2f}s "
+                f"({self.stdout_bytes} bytes out, {self.stderr_bytes} bytes err)")
+
+def split_command(command):
+    """Split a command line into arguments without invoking a shell."""
+    if not isinstance(command, str):
+        return list(command)
+    return shlex.split(command, posix=os.name != "nt")
+
+def split_commands(text):
+    """Split a line of ';'-separated commands, ignoring ';' inside quotes or after a backslash."""
+    commands, current = [], []
+    quote = None
+    escaped = False
+    for char in text:
+        if escaped:
+            escaped = False
+        elif char == "\\" and quote != "'" and os.name != "nt":
+            escaped = True
+        elif quote:
+            if char == quote:
+                quote = None
+        elif char in "'\"":
+            quote = char
+        elif char == ";":
+            commands.append("".join(current))
+            current = []
+            continue
+        current.append(char)
+    commands.append("".join(current))
+    return [command.strip() for command in commands if command.strip()]
+
+def print_output(prefix=""):
+    """Return an output callback that echoes each line, optionally prefixed."""
+    def echo(stream_name, line):
+        line = line.rstrip("\r\n")
+        if stream_name == "stderr":
+            line = f"{BRIGHT_RED}{line}{RESET}"
+        print(f"{prefix}{line}", flush=True)
+    return echo
+
+async def _pump(reader, name, result, chunks, on_output):
+    """Copy one output stream into chunks, handing each line to on_output.
+
+    Reads fixed-size chunks and splits lines itself, so a line of any length
+    never overruns the stream reader's buffer limit.
+    """
+    def emit(line):
+        text = line.decode(errors="replace")
+        chunks.append(text)
+        if on_output:
+            on_output(name, text)
+
+    pending = bytearray()
+    while True:
+        data = await reader.read(OUTPUT_CHUNK_SIZE)
+        if not data:
+            break
+        setattr(result, f"{name}_bytes", getattr(result, f"{name}_bytes") + len(data))
+        end = data.rfind(b"\n")
+        if end < 0:
+            pending += data
+            continue
+        lines = bytes(pending + data[:end]).split(b"\n")
+        pending = bytearray(data[end + 1:])
+        for line in lines:
+            emit(line + b"\n")
+    if pending:
+        emit(bytes(pending))
+
+def _kill(process):
+    """Kill a child process that may already have exited."""
     try:
-        subprocess.run(command, shell=True, check=True)
+        process.kill()
+    except ProcessLookupError:
+        pass
+
+async def run_command(command, timeout=COMMAND_TIMEOUT, on_output=None, semaphore=None):
+    """Run a command without a shell, capturing and optionally streaming its output."""
+    result = CommandResult(command if isinstance(command, str) else shlex.join(command))
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(1)
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *split_command(command), stdin=subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+        except (OSError, ValueError) as e:
+            result.error = str(e) or type(e).__name__
+            result.duration = time.perf_counter() - start
+            return result
+        stdout, stderr = [], []
+        pumps = asyncio.gather(_pump(process.stdout, "stdout", result, stdout, on_output),
+                               _pump(process.stderr, "stderr", result, stderr, on_output))
+        try:
+            await asyncio.wait_for(asyncio.shield(pumps), timeout)
+        except asyncio.TimeoutError:
+            result.timed_out = True
+        except Exception as e:
+            result.error = f"reading output failed: {e or type(e).__name__}"
+        finally:
+            # Timeouts, read errors and cancellation (Ctrl+C) must never leave the child running
+            if result.timed_out or result.error or not pumps.done():
+                _kill(process)
+        if not pumps.done():
+            try:
+                # Grandchildren may still hold the pipes open; don't wait on them forever
+                await asyncio.wait_for(pumps, 1)
+            except (asyncio.TimeoutError, Exception):
+                pass
+        result.returncode = await process.wait()
+        result.duration = time.perf_counter() - start
+        result.stdout = "".join(stdout)
+        result.stderr = "".join(stderr)
+    return result
+
+async def run_commands_async(commands, limit=MAX_CONCURRENT_COMMANDS, timeout=COMMAND_TIMEOUT, stream=False):
+    """Run independent commands concurrently, at most limit at a time."""
+    semaphore = asyncio.Semaphore(limit)
+    return await asyncio.gather(*(
+        run_command(command, timeout, print_output(f"[{i}] ") if stream else None, semaphore)
+        for i, command in enumerate(commands, 1)))
+
+def record_result(result, success_message=None):
+    """Add a finished command to the history and log how it ended."""
+    command_history.append(result.command, result.duration, result.returncode)
+    if result.ok:
+        logging.info(result.describe())
         if success_message:
             logging.info(success_message)
             print(f"\n{BRIGHT_GREEN}{success_message}{RESET}")
-    except subprocess.CalledProcessError as e:
-        logging.error(f"Command failed: {e}")
-        print(f"\n{BRIGHT_RED}Command failed: {e}{RESET}")
+    else:
+        logging.error(f"Command failed: {result.describe()}")
+        print(f"\n{BRIGHT_RED}Command failed: {result.describe()}{RESET}")
+
+def record_action(command, started, exit_status):
+    """Add a natively implemented menu action to the history, timed from started (a perf_counter value)."""
+    command_history.append(command, time.perf_counter() - started, exit_status)
+
+def dns_exit_status(answers):
+    """Return the worst rcode among answers; a query with no reply counts as SERVFAIL."""
+    return max((2 if answer.rcode is None else answer.rcode for answer in answers), default=0)
+
+def run_commands(commands, limit=MAX_CONCURRENT_COMMANDS, timeout=COMMAND_TIMEOUT, stream=True):
+    """Run independent commands concurrently and record each result."""
+    results = asyncio.run(run_commands_async(commands, limit, timeout, stream))
+    for result in results:
+        record_result(result)
+    return results
+
+def execute_command(command, success_message=None, timeout=COMMAND_TIMEOUT):
+    """Execute a system command, streaming its output, and log the result."""
+    result = asyncio.run(run_command(command, timeout, print_output()))
+    record_result(result, success_message)
+    return result
+
+class PingResult:
+    """Round-trip statistics for one probed host."""
+
+    __slots__ = ("host", "address", "method", "sent", "rtts", "error")
+
+    def __init__(self, host, address=None, method=None):
+        self.host = host
+        self.address = address
+        self.method = method
+        self.sent = 0
+        self.rtts = []  # milliseconds, one per reply
+        self.error = None
+
+    @property
+    def received(self):
+        return len(self.rtts)
+
+    @property
+    def loss(self):
+        return 100.0 * (self.sent - self.received) / self.sent if self.sent else 100.0
+
+    @property
+    def reachable(self):
+        return bool(self.rtts)
+
+    def stats(self):
+        """Return (min, avg, max, p99, jitter) in milliseconds, or None without replies."""
+        if not self.rtts:
+            return None
+        ordered = sorted(self.rtts)
+        p99 = ordered[max(math.ceil(0.99 * len(ordered)) - 1, 0)]
+        # Jitter as the mean difference between consecutive round trips (RFC 3550 style)
+        deltas = [abs(b - a) for a, b in zip(self.rtts, self.rtts[1:])]
+        jitter = sum(deltas) / len(deltas) if deltas else 0.0
+        return ordered[0], sum(ordered) / len(ordered), ordered[-1], p99, jitter
+
+def icmp_checksum(data):
+    """Return the RFC 1071 internet checksum of data."""
+    if len(data) % 2:
+        data += b"\0"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+_icmp_support = {}
+
+def icmp_available(family=socket.AF_INET):
+    """Return True if unprivileged ICMP datagram sockets can be opened for family."""
+    if family not in _icmp_support:
+        proto = socket.IPPROTO_ICMP if family == socket.AF_INET else socket.IPPROTO_ICMPV6
+        try:
+            socket.socket(family, socket.SOCK_DGRAM, proto).close()
+            _icmp_support[family] = True
+        except (OSError, AttributeError):
+            _icmp_support[family] = False
+    return _icmp_support[family]
+
+async def _icmp_echo(sock, family, sequence, payload, timeout):
+    """Send one echo request on a connected ICMP socket; return the RTT in ms or None."""
+    loop = asyncio.get_running_loop()
+    request_type, reply_type = (8, 0) if family == socket.AF_INET else (128, 129)
+    # The kernel replaces the identifier with the socket's own and filters replies on it
+    header = struct.pack("!BBHHH", request_type, 0, 0, 0, sequence)
+    packet = struct.pack("!BBHHH", request_type, 0, icmp_checksum(header + payload), 0, sequence) + payload
+    sent = time.perf_counter()
+    await loop.sock_sendall(sock, packet)
+    deadline = sent + timeout
+    while True:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            return None
+        try:
+            data = await asyncio.wait_for(loop.sock_recv(sock, 65535), remaining)
+        except asyncio.TimeoutError:
+            return None
+        if family == socket.AF_INET and data and data[0] >> 4 == 4:
+            data = data[(data[0] & 0x0F) * 4:]  # some platforms include the IP header
+        if len(data) >= 8:
+            kind, _, _, _, reply_sequence = struct.unpack("!BBHHH", data[:8])
+            if kind == reply_type and reply_sequence == sequence:
+                return (time.perf_counter() - sent) * 1000
+
+async def _tcp_echo(address, port, timeout):
+    """Time a TCP handshake to address; a refused connection still proves the host is up."""
+    start = time.perf_counter()
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(address, port), timeout)
+    except ConnectionRefusedError:
+        return (time.perf_counter() - start) * 1000
+    except (OSError, asyncio.TimeoutError):
+        return None
+    writer.close()
+    return (time.perf_counter() - start) * 1000
+
+async def probe_host(host, count=4, interval=1.0, timeout=1.0, size=56, port=TCP_PROBE_PORT):
+    """Probe one host with ICMP echo, or TCP connects where ICMP sockets are not permitted."""
+    loop = asyncio.get_running_loop()
+    result = PingResult(host)
+    try:
+        infos = await loop.getaddrinfo(host, None, type=socket.SOCK_STREAM)
+    except socket.gaierror as e:
+        result.error = f"unresolved ({e.strerror})"
+        return result
+    except UnicodeError:
+        # The IDNA codec rejects malformed names such as "a..b" before any lookup
+        result.error = "unresolved (invalid hostname)"
+        return result
+    family, _, _, _, sockaddr = infos[0]
+    result.address = sockaddr[0]
+    sock = None
+    result.method = "icmp" if icmp_available(family) else f"tcp/{port}"
+    payload = bytes(random.getrandbits(8) for _ in range(size))
+    try:
+        if result.method == "icmp":
+            proto = socket.IPPROTO_ICMP if family == socket.AF_INET else socket.IPPROTO_ICMPV6
+            sock = socket.socket(family, socket.SOCK_DGRAM, proto)
+            sock.setblocking(False)
+            sock.connect(sockaddr)  # datagram connect only sets the peer, it never blocks
+        for sequence in range(count):
+            started = time.perf_counter()
+            if sock:
+                rtt = await _icmp_echo(sock, family, sequence, payload, timeout)
+            else:
+                rtt = await _tcp_echo(result.address, port, timeout)
+            result.sent += 1
+            if rtt is not None:
+                result.rtts.append(rtt)
+            if sequence < count - 1:
+                await asyncio.sleep(max(interval - (time.perf_counter() - started), 0))
+    except OSError as e:
+        result.error = e.strerror or str(e)
+    finally:
+        if sock:
+            sock.close()
+    return result
+
+def expand_targets(targets):
+    """Yield individual hosts from hostnames, addresses and CIDR blocks."""
+    for target in targets:
+        if "/" in target:
+            network = ipaddress.ip_network(target, strict=False)
+            hosts = network.hosts() if network.num_addresses > 2 else iter(network)
+            for address in hosts:
+                yield str(address)
+        else:
+            yield target
+
+async def sweep_async(targets, count=4, interval=1.0, timeout=1.0, size=56, port=TCP_PROBE_PORT,
+                      limit=MAX_CONCURRENT_PROBES):
+    """Probe every target concurrently with at most limit hosts in flight."""
+    hosts = expand_targets(targets)
+    results = []
+
+    async def worker():
+        for host in hosts:
+            results.append(await probe_host(host, count, interval, timeout, size, port))
+
+    await asyncio.gather(*(worker() for _ in range(limit)))
+    return results
+
+def sweep(targets, **options):
+    """Run sweep_async from synchronous code."""
+    return asyncio.run(sweep_async(targets, **options))
+
+def print_ping_results(results, only_reachable=False):
+    """Print a reachability table followed by a one-line summary."""
+    def sort_key(result):
+        try:
+            address = ipaddress.ip_address(result.address or result.host)
+            return address.version, address
+        except ValueError:
+            return 7, result.host
+    print(f"\n{BOLD}{'Host':<28} {'Method':<9} {'Sent':>4} {'Recv':>4} {'Loss':>6} "
+          f"{'Min':>8} {'Avg':>8} {'Max':>8} {'P99':>8} {'Jitter':>8}{RESET}")
+    for result in sorted(results, key=sort_key):
+        if only_reachable and not result.reachable:
+            continue
+        name = result.host if result.address in (None, result.host) else f"{result.host} ({result.address})"
+        stats = result.stats()
+        color = BRIGHT_GREEN if result.loss == 0 else (BRIGHT_YELLOW if stats else BRIGHT_RED)
+        line = f"{name[:28]:<28} {result.method or '-':<9} {result.sent:>4} {result.received:>4} {result.loss:>5.0f}%"
+        if stats:
+            line += "".join(f" {value:>8.2f}" for value in stats)
+        elif result.error:
+            line += f" {result.error}"
+        print(f"{color}{line}{RESET}")
+    up = sum(result.reachable for result in results)
+    print(f"\n{BRIGHT_CYAN}{up} of {len(results)} host(s) reachable (times in ms).{RESET}")
+
+class DnsRecord:
+    """One resource record from a DNS answer."""
+
+    __slots__ = ("name", "rtype", "ttl", "value")
+
+    def __init__(self, name, rtype, ttl, value):
+        self.name = name
+        self.rtype = rtype
+        self.ttl = ttl
+        self.value = value
+
+    @property
+    def type_name(self):
+        return DNS_TYPE_NAMES.get(self.rtype, str(self.rtype))
+
+    def __repr__(self):
+        return f"{self.name} {self.ttl} {self.type_name} {self.value}"
+
+class DnsAnswer:
+    """Result of one (name, type) query."""
+
+    __slots__ = ("name", "qtype", "rcode", "records", "error", "cached", "elapsed")
+
+    def __init__(self, name, qtype, rcode=None, records=(), error=None, cached=False, elapsed=0.0):
+        self.name = name
+        self.qtype = qtype
+        self.rcode = rcode
+        self.records = list(records)
+        self.error = error
+        self.cached = cached
+        self.elapsed = elapsed
+
+    @property
+    def status(self):
+        return self.error or DNS_RCODES.get(self.rcode, f"RCODE{self.rcode}")
+
+def encode_dns_name(name):
+    """Encode a domain name as DNS wire-format labels."""
+    name = name.rstrip(".")
+    if not name:
+        return b"\0"
+    wire = b""
+    for label in name.encode("idna").split(b"."):
+        if not 0 < len(label) < 64:
+            raise ValueError(f"Invalid domain name: {name!r}")
+        wire += bytes((len(label),)) + label
+    return wire + b"\0"
+
+def build_dns_query(name, qtype, query_id):
+    """Return a recursive query packet for name and record type number qtype."""
+    return struct.pack("!HHHHHH", query_id, 0x0100, 1, 0, 0, 0) + encode_dns_name(name) + struct.pack("!HH", qtype, 1)
+
+def read_dns_name(data, offset):
+    """Decode a possibly compressed name at offset; return (name, offset after it)."""
+    labels = []
+    end = None
+    for _ in range(128):
+        length = data[offset]
+        if length & 0xC0 == 0xC0:
+            if end is None:
+                end = offset + 2
+            offset = ((length & 0x3F) << 8) | data[offset + 1]
+            continue
+        offset += 1
+        if length == 0:
+            return ".".join(labels) or ".", end if end is not None else offset
+        labels.append(data[offset:offset + length].decode("ascii", "replace"))
+        offset += length
+    raise ValueError("DNS name compression loop")
+
+def _decode_rdata(data, offset, rtype, length):
+    """Render the RDATA of one record as text."""
+    if rtype == 1:
+        return socket.inet_ntop(socket.AF_INET, data[offset:offset + length])
+    if rtype == 28:
+        return socket.inet_ntop(socket.AF_INET6, data[offset:offset + length])
+    if rtype in (2, 5, 12):
+        return read_dns_name(data, offset)[0]
+    if rtype == 15:
+        preference, = struct.unpack_from("!H", data, offset)
+        return f"{preference} {read_dns_name(data, offset + 2)[0]}"
+    if rtype == 6:
+        mname, offset = read_dns_name(data, offset)
+        rname, offset = read_dns_name(data, offset)
+        return f"{mname} {rname} " + " ".join(map(str, struct.unpack_from("!IIIII", data, offset)))
+    return data[offset:offset + length].hex()
+
+def parse_dns_response(data):
+    """Parse a response into (id, flags, question, answers, authority)."""
+    query_id, flags, qdcount, ancount, nscount, _ = struct.unpack_from("!HHHHHH", data)
+    offset = 12
+    question = None
+    for _ in range(qdcount):
+        qname, offset = read_dns_name(data, offset)
+        question = (qname.lower(), struct.unpack_from("!H", data, offset)[0])
+        offset += 4
+    sections = ([], [])
+    for section, count in zip(sections, (ancount, nscount)):
+        for _ in range(count):
+            name, offset = read_dns_name(data, offset)
+            rtype, _, ttl, length = struct.unpack_from("!HHIH", data, offset)
+            offset += 10
+            section.append(DnsRecord(name, rtype, ttl, _decode_rdata(data, offset, rtype, length)))
+            offset += length
+    return query_id, flags, question, sections[0], sections[1]
+
+class DnsCache:
+    """LRU cache of DNS answers that expires entries by their TTL."""
+
+    def __init__(self, maxsize=DNS_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()  # (name, qtype) -> (stored, expires, rcode, records)
+
+    def get(self, name, qtype):
+        key = (name, qtype)
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        stored, expires, rcode, records = entry
+        now = time.monotonic()
+        if now >= expires:
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        age = int(now - stored)
+        records = [DnsRecord(r.name, r.rtype, max(r.ttl - age, 0), r.value) for r in records]
+        return DnsAnswer(name, qtype, rcode, records, cached=True)
+
+    def put(self, answer, authority=()):
+        """Store a NOERROR or NXDOMAIN answer for the smallest TTL involved."""
+        if answer.rcode == 0 and answer.records:
+            ttl = min(record.ttl for record in answer.records)
+        elif answer.rcode in (0, 3):
+            # Negative caching (RFC 2308): the SOA's minimum field bounds the TTL
+            soa = [record for record in authority if record.rtype == 6]
+            ttl = min(soa[0].ttl, int(soa[0].value.split()[-1])) if soa else DNS_NEGATIVE_TTL
+        else:
+            return
+        if ttl <= 0:
+            return
+        now = time.monotonic()
+        self.entries[(answer.name, answer.qtype)] = (now, now + ttl, answer.rcode, answer.records)
+        self.entries.move_to_end((answer.name, answer.qtype))
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entries)
+
+class _DnsProtocol(asyncio.DatagramProtocol):
+    """Dispatch UDP responses to the pending query with the same id and question."""
+
+    def __init__(self):
+        self.pending = {}  # query id -> (question, future)
+
+    def datagram_received(self, data, addr):
+        try:
+            query_id, _, question, _, _ = parse_dns_response(data)
+        except (ValueError, struct.error, IndexError):
+            return
+        entry = self.pending.get(query_id)
+        if entry and entry[0] == question and not entry[1].done():
+            entry[1].set_result(data)
+
+    def error_received(self, exc):
+        for _, future in self.pending.values():
+            if not future.done():
+                future.set_exception(exc)
+
+def system_nameservers():
+    """Return the nameservers from /etc/resolv.conf, or public resolvers if there are none."""
+    servers = []
+    try:
+        with open("/etc/resolv.conf") as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) >= 2 and fields[0] == "nameserver":
+                    servers.append(fields[1].split("%")[0])
+    except OSError:
+        pass
+    return servers or ["8.8.8.8", "1.1.1.1"]
+
+class DnsResolver:
+    """Asynchronous stub resolver: UDP with TCP retry on truncation, backed by a DnsCache."""
+
+    def __init__(self, servers=None, port=53, timeout=DNS_TIMEOUT, attempts=2, cache=None):
+        self.servers = list(servers or system_nameservers())
+        self.port = port
+        self.timeout = timeout
+        self.attempts = attempts
+        self.cache = DnsCache() if cache is None else cache
+        self.endpoints = {}  # server -> task opening (transport, protocol), valid for one event loop
+
+    async def _endpoint(self, server):
+        # Store the opening task, not its result, so concurrent first queries share one socket
+        if server not in self.endpoints:
+            loop = asyncio.get_running_loop()
+            self.endpoints[server] = loop.create_task(loop.create_datagram_endpoint(
+                _DnsProtocol, remote_addr=(server, self.port)))
+        return await self.endpoints[server]
+
+    async def _query_udp(self, server, name, qnumber):
+        """Send one query over UDP; return (response, packet sent)."""
+        transport, protocol = await self._endpoint(server)
+        query_id = random.getrandbits(16)
+        while query_id in protocol.pending:
+            query_id = random.getrandbits(16)
+        packet = build_dns_query(name, qnumber, query_id)
+        question = (name, qnumber)
+        future = asyncio.get_running_loop().create_future()
+        protocol.pending[query_id] = (question, future)
+        try:
+            transport.sendto(packet)
+            return await asyncio.wait_for(future, self.timeout), packet
+        finally:
+            protocol.pending.pop(query_id, None)
+
+    async def _query_tcp(self, server, packet):
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(server, self.port), self.timeout)
+        try:
+            writer.write(struct.pack("!H", len(packet)) + packet)
+            length, = struct.unpack("!H", await asyncio.wait_for(reader.readexactly(2), self.timeout))
+            return await asyncio.wait_for(reader.readexactly(length), self.timeout)
+        finally:
+            writer.close()
+
+    async def query(self, name, qtype="A"):
+        """Resolve one record type for name, answering from the cache when possible."""
+        if qtype == "PTR":
+            try:
+                name = ipaddress.ip_address(name).reverse_pointer
+            except ValueError:
+                pass
+        qnumber = DNS_TYPES[qtype]
+        name = name.rstrip(".").lower()
+        try:
+            # Work with the ASCII (IDNA) form throughout: it is what replies and the cache carry
+            name = name.encode("idna").decode("ascii") if name else "."
+            encode_dns_name(name)
+        except (ValueError, UnicodeError) as e:
+            return DnsAnswer(name or ".", qnumber, error=str(e) or "invalid domain name")
+        cached = self.cache.get(name, qnumber)
+        if cached:
+            return cached
+        start = time.perf_counter()
+        answer = DnsAnswer(name, qnumber)
+        for attempt in range(self.attempts * len(self.servers)):
+            server = self.servers[attempt % len(self.servers)]
+            try:
+                data, packet = await self._query_udp(server, name, qnumber)
+                _, flags, _, _, _ = parse_dns_response(data)
+                if flags & 0x0200:  # truncated: repeat over TCP
+                    data = await self._query_tcp(server, packet)
+                _, flags, _, records, authority = parse_dns_response(data)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, struct.error, IndexError, ValueError) as e:
+                answer.error = "timeout" if isinstance(e, asyncio.TimeoutError) else (str(e) or type(e).__name__)
+                continue
+            answer.error = None
+            answer.rcode = flags & 0x000F
+            answer.records = records
+            if answer.rcode in (0, 3):
+                self.cache.put(answer, authority)
+                break
+        answer.elapsed = time.perf_counter() - start
+        return answer
+
+    async def resolve(self, name, qtypes=("A", "AAAA")):
+        """Query several record types for name in parallel."""
+        return await asyncio.gather(*(self.query(name, qtype) for qtype in qtypes))
+
+    async def resolve_many(self, names, qtypes=("A",), limit=MAX_DNS_IN_FLIGHT, on_answer=None):
+        """Resolve an iterable of names with at most limit queries in flight; return the answer count."""
+        names = iter(names)
+        count = 0
+
+        async def worker():
+            nonlocal count
+            for name in names:
+                for answer in await self.resolve(name, qtypes):
+                    count += 1
+                    if on_answer:
+                        on_answer(name, answer)
+
+        await asyncio.gather(*(worker() for _ in range(max(limit // len(qtypes), 1))))
+        return count
+
+    def close(self):
+        """Close the UDP sockets; the cache survives for the next run."""
+        for task in self.endpoints.values():
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled() and task.exception() is None:
+                task.result()[0].close()
+        self.endpoints.clear()
+
+    def run(self, coroutine):
+        """Run one resolver coroutine to completion from synchronous code."""
+        async def runner():
+            try:
+                return await coroutine
+            finally:
+                self.close()
+        return asyncio.run(runner())
+
+_resolvers = {}
+
+def get_resolver(server=None):
+    """Return a long-lived resolver (and cache) for server, or for the system nameservers."""
+    if server not in _resolvers:
+        _resolvers[server] = DnsResolver([server] if server else None)
+    return _resolvers[server]
+
+def print_dns_answers(answers):
+    """Print each answer's records, or its failure status."""
+    for answer in answers:
+        qtype = DNS_TYPE_NAMES[answer.qtype]
+        source = "cache" if answer.cached else f"{answer.elapsed * 1000:.1f} ms"
+        if answer.records:
+            print(f"\n{BRIGHT_GREEN}{qtype} records for {answer.name} ({source}):{RESET}")
+            for record in answer.records:
+                print(f"  {record.name:<40} {record.ttl:>7} {record.type_name:<6} {record.value}")
+        else:
+            print(f"\n{BRIGHT_RED}{qtype} {answer.name}: {answer.status if answer.rcode != 0 or answer.error else 'no records'} ({source}){RESET}")
+
+def bulk_resolve(input_path, output_path, qtypes=("A",), limit=MAX_DNS_IN_FLIGHT, server=None):
+    """Resolve every domain listed in input_path, writing tab-separated results as they arrive."""
+    resolver = get_resolver(server)
+    statuses = {}
+
+    def names():
+        with open(input_path) as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    yield line
+
+    start = time.perf_counter()
+    with open(output_path, "w") as out:
+        def on_answer(name, answer):
+            statuses[answer.status] = statuses.get(answer.status, 0) + 1
+            values = ",".join(record.value for record in answer.records if record.rtype == answer.qtype)
+            out.write(f"{name}\t{DNS_TYPE_NAMES[answer.qtype]}\t{answer.status}\t{values}\n")
+        count = resolver.run(resolver.resolve_many(names(), qtypes, limit, on_answer))
+    return count, statuses, time.perf_counter() - start
+
+class ArpEntry:
+    """One neighbour from /proc/net/arp."""
+
+    __slots__ = ("address", "hw_type", "flags", "mac", "device")
+
+    def __init__(self, address, hw_type, flags, mac, device):
+        self.address = address
+        self.hw_type = hw_type
+        self.flags = flags
+        self.mac = mac
+        self.device = device
+
+    @property
+    def complete(self):
+        return bool(self.flags & 0x02)
+
+class RouteEntry:
+    """One route from /proc/net/route or /proc/net/ipv6_route."""
+
+    __slots__ = ("destination", "gateway", "flags", "metric", "device")
+
+    def __init__(self, destination, gateway, flags, metric, device):
+        self.destination = destination  # ipaddress network
+        self.gateway = gateway  # ipaddress address, unspecified when directly connected
+        self.flags = flags
+        self.metric = metric
+        self.device = device
+
+    @property
+    def is_default(self):
+        return self.destination.prefixlen == 0
+
+class Connection:
+    """One socket from /proc/net/{tcp,udp}{,6}.
+
+    Endpoints are kept in the kernel's hex form and decoded on first use, so
+    reading a large table costs little more than splitting its lines.
+    """
+
+    __slots__ = ("proto", "family", "local", "remote", "state", "queues", "uid", "inode")
+
+    def __init__(self, proto, family, local, remote, state, queues, uid, inode):
+        self.proto = proto
+        self.family = family
+        self.local = local  # e.g. "0100007F:0035"
+        self.remote = remote
+        self.state = state
+        self.queues = queues  # "tx:rx" in hex
+        self.uid = uid
+        self.inode = inode
+
+    @property
+    def key(self):
+        """Identity of the connection: protocol plus both endpoints (the 4-tuple)."""
+        return (self.proto, self.local, self.remote)
+
+    local_address = property(lambda self: decode_proc_address(self.local, self.family)[0])
+    local_port = property(lambda self: int(self.local[-4:], 16))
+    remote_address = property(lambda self: decode_proc_address(self.remote, self.family)[0])
+    remote_port = property(lambda self: int(self.remote[-4:], 16))
+    tx_queue = property(lambda self: int(self.queues.partition(":")[0], 16))
+    rx_queue = property(lambda self: int(self.queues.partition(":")[2], 16))
+
+def format_flags(value, names):
+    """Render a flag bitmask as letters, e.g. 0x3 -> 'UG'."""
+    return "".join(letter for bit, letter in names if value & bit)
+
+def read_arp_table(proc_net=PROC_NET):
+    """Parse /proc/net/arp into ArpEntry rows."""
+    entries = []
+    for line in read_table(f"{proc_net}/arp"):
+        fields = line.split()
+        if len(fields) >= 6:
+            entries.append(ArpEntry(fields[0], int(fields[1], 16), int(fields[2], 16), fields[3], fields[5]))
+    return entries
+
+def read_routes(proc_net=PROC_NET):
+    """Parse the IPv4 and IPv6 routing tables into RouteEntry rows."""
+    routes = []
+    for line in read_table(f"{proc_net}/route"):
+        fields = line.split()
+        if len(fields) < 8:
+            continue
+        destination, gateway, mask = (ipaddress.IPv4Address(struct.unpack("<I", bytes.fromhex(f))[0])
+                                      for f in (fields[1], fields[2], fields[7]))
+        network = ipaddress.IPv4Network(f"{destination}/{mask}", strict=False)
+        routes.append(RouteEntry(network, gateway, int(fields[3], 16), int(fields[6]), fields[0]))
+    try:
+        with open(f"{proc_net}/ipv6_route") as f:
+            lines = f.read().splitlines()  # this table has no header line
+    except OSError:
+        lines = []
+    for line in lines:
+        fields = line.split()
+        if len(fields) < 10:
+            continue
+        network = ipaddress.IPv6Network((int(fields[0], 16), int(fields[1], 16)), strict=False)
+        gateway = ipaddress.IPv6Address(int(fields[4], 16))
+        routes.append(RouteEntry(network, gateway, int(fields[8], 16), int(fields[5], 16), fields[9]))
+    return routes
+
+def read_connections(protocols=None, proc_net=PROC_NET):
+    """Parse /proc/net/{tcp,udp}{,6} into Connection rows without spawning netstat."""
+    connections = []
+    append = connections.append
+    for proto, family in SOCKET_TABLES:
+        if protocols and proto.rstrip("6") not in protocols:
+            continue
+        for line in read_table(f"{proc_net}/{proto}"):
+            fields = line.split(None, 10)
+            if len(fields) >= 10:
+                append(_make_connection(proto, family, fields))
+    return connections
+
+def _make_connection(proto, family, fields):
+    """Build a Connection from the split fields of one /proc/net line."""
+    states = TCP_STATES if proto.startswith("tcp") else UDP_STATES
+    return Connection(proto, family, fields[1], fields[2], states.get(fields[3], fields[3]),
+                      fields[4], int(fields[7]), int(fields[9]))
+
+def select_rows(rows, sort_by=None, reverse=False, state=None, port=None, address=None, **equals):
+    """Filter and sort table rows.
+
+    state matches case-insensitively, port matches either end of a connection,
+    address may be an IP or CIDR block and matches any address attribute, and
+    other keywords compare attributes for equality.
+    """
+    if state:
+        state = state.upper()
+        rows = [row for row in rows if row.state == state]
+    if port is not None:
+        port = f"{int(port):04X}"
+        rows = [row for row in rows if row.local.endswith(port) or row.remote.endswith(port)]
+    if address:
+        network = ipaddress.ip_network(address, strict=False)
+        fields = [f for f in ("address", "local_address", "remote_address", "gateway") if rows and hasattr(rows[0], f)]
+
+        def matches(row):
+            for field in fields:
+                value = getattr(row, field)
+                try:
+                    if ipaddress.ip_address(value) in network:
+                        return True
+                except (TypeError, ValueError):
+                    continue
+            return False
+        rows = [row for row in rows if matches(row)]
+    for field, value in equals.items():
+        rows = [row for row in rows if getattr(row, field) == value]
+    if sort_by:
+        rows = sorted(rows, key=attrgetter(*sort_by.split(",")), reverse=reverse)
+    return list(rows)
+
+def print_arp_table(entries):
+    """Print ARP entries in a table."""
+    print(f"\n{BOLD}{'Address':<40} {'MAC':<18} {'Flags':<6} {'Device'}{RESET}")
+    for entry in entries:
+        print(f"{entry.address:<40} {entry.mac:<18} {format_flags(entry.flags, ARP_FLAGS):<6} {entry.device}")
+    print(f"\n{BRIGHT_CYAN}{len(entries)} entries.{RESET}")
+
+def print_routes(routes):
+    """Print routes in a table."""
+    print(f"\n{BOLD}{'Destination':<44} {'Gateway':<26} {'Flags':<6} {'Metric':>7} {'Device'}{RESET}")
+    for route in routes:
+        gateway = "*" if route.gateway.is_unspecified else str(route.gateway)
+        destination = "default" if route.is_default else str(route.destination)
+        print(f"{destination:<44} {gateway:<26} {format_flags(route.flags, ROUTE_FLAGS):<6} {route.metric:>7} {route.device}")
+    print(f"\n{BRIGHT_CYAN}{len(routes)} routes.{RESET}")
+
+def format_endpoint(address, port):
+    """Format address:port, bracketing IPv6 addresses."""
+    return f"[{address}]:{port}" if ":" in address else f"{address}:{port}"
+
+def print_connections(connections):
+    """Print connections in a netstat-like table."""
+    print(f"\n{BOLD}{'Proto':<6} {'Local Address':<46} {'Remote Address':<46} {'State':<12} {'Recv-Q':>6} {'Send-Q':>6}{RESET}")
+    for c in connections:
+        print(f"{c.proto:<6} {format_endpoint(c.local_address, c.local_port):<46} "
+              f"{format_endpoint(c.remote_address, c.remote_port):<46} {c.state:<12} {c.rx_queue:>6} {c.tx_queue:>6}")
+    print(f"\n{BRIGHT_CYAN}{len(connections)} connections.{RESET}")
+
+class ConnectionWatcher:
+    """Diff successive connection tables and keep running per-state counts."""
+
+    def __init__(self, protocols=None, proc_net=PROC_NET, history=3600):
+        self.protocols = protocols
+        self.proc_net = proc_net
+        self.table = {}  # (proto, local, remote, inode, state code) -> raw /proc line
+        self.counts = {}  # state -> number of connections
+        self.history = deque(maxlen=history)  # (timestamp, counts) per poll
+
+    def poll(self):
+        """Read the table and return (opened, closed, changed) since the last poll.
+
+        changed holds (old_state, connection) pairs. Rows are kept as raw /proc
+        lines keyed on a tuple of strings (which the garbage collector need not
+        track) and only the keys that differ between polls become Connection
+        objects, so the cost beyond reading the table is proportional to the
+        churn rather than to the table size.
+        """
+        current = {}
+        for proto, family in SOCKET_TABLES:
+            if self.protocols and proto.rstrip("6") not in self.protocols:
+                continue
+            for line in read_table(f"{self.proc_net}/{proto}"):
+                fields = line.split(None, 10)
+                if len(fields) >= 10:
+                    current[(proto, fields[1], fields[2], fields[9], fields[3])] = line
+        previous = self.table
+        # Several sockets can share a 4-tuple (SO_REUSEPORT listeners, unconnected
+        # UDP sockets), so new rows are grouped per 4-tuple rather than keyed on it
+        appeared = {}
+        for key in current.keys() - previous.keys():
+            appeared.setdefault(key[:3], []).append(key)
+        counts = self.counts
+        closed, changed = [], []
+        for key in previous.keys() - current.keys():
+            old = self._connection(key, previous[key])
+            counts[old.state] -= 1
+            # A state change keeps the socket's inode, except that TIME_WAIT rows have none
+            candidates = appeared.get(key[:3], ())
+            new_key = next((k for k in candidates if k[3] == key[3] or k[3] == "0"), None)
+            if new_key is None:
+                closed.append(old)
+            else:
+                candidates.remove(new_key)
+                connection = self._connection(new_key, current[new_key])
+                counts[connection.state] = counts.get(connection.state, 0) + 1
+                changed.append((old.state, connection))
+        opened = [self._connection(key, current[key]) for keys in appeared.values() for key in keys]
+        for connection in opened:
+            counts[connection.state] = counts.get(connection.state, 0) + 1
+        self.table = current
+        self.history.append((time.time(), {state: n for state, n in counts.items() if n}))
+        return opened, closed, changed
+
+    @staticmethod
+    def _connection(key, line):
+        proto = key[0]
+        family = socket.AF_INET6 if proto.endswith("6") else socket.AF_INET
+        return _make_connection(proto, family, line.split(None, 10))
+
+def format_state_counts(counts):
+    """Render per-state counts, largest first."""
+    return " ".join(f"{state}={n}" for state, n in sorted(counts.items(), key=lambda item: -item[1]) if n)
+
+def watch_connections(interval=WATCH_INTERVAL, protocols=None, max_events=WATCH_MAX_EVENTS):
+    """Print connection open/close/state-change events until interrupted with Ctrl+C."""
+    watcher = ConnectionWatcher(protocols)
+    watcher.poll()
+    print(f"\n{BRIGHT_CYAN}Watching {sum(watcher.counts.values())} connections every {interval}s "
+          f"(Ctrl+C to stop): {format_state_counts(watcher.counts)}{RESET}")
+    try:
+        while True:
+            started = time.perf_counter()
+            opened, closed, changed = watcher.poll()
+            elapsed = time.perf_counter() - started
+            events = [(BRIGHT_GREEN, "+", c, c.state) for c in opened[:max_events]]
+            events += [(BRIGHT_RED, "-", c, c.state) for c in closed[:max_events - len(events)]]
+            events += [(BRIGHT_YELLOW, "~", c, f"{old_state} -> {c.state}")
+                       for old_state, c in changed[:max_events - len(events)]]
+            total = len(opened) + len(closed) + len(changed)
+            if total:
+                for color, sign, c, state in events:
+                    print(f"{color}{sign} {c.proto:<5} {format_endpoint(c.local_address, c.local_port)} -> "
+                          f"{format_endpoint(c.remote_address, c.remote_port)} {state}{RESET}")
+                if total > len(events):
+                    print(f"  ... and {total - len(events)} more events")
+                print(f"{CYAN}{time.strftime('%H:%M:%S')} +{len(opened)} -{len(closed)} ~{len(changed)} "
+                      f"({elapsed * 1000:.0f} ms) | {format_state_counts(watcher.counts)}{RESET}")
+            time.sleep(max(interval - elapsed, 0))
+    except KeyboardInterrupt:
+        pass
+    if watcher.history:
+        first, last = watcher.history[0], watcher.history[-1]
+        print(f"\n{BRIGHT_GREEN}Per-state counts over {last[0] - first[0]:.1f}s ({len(watcher.history)} polls):{RESET}")
+        for state in sorted({state for _, counts in watcher.history for state in counts}):
+            values = [counts.get(state, 0) for _, counts in watcher.history]
+            print(f"  {state:<12} start={values[0]:<7} end={values[-1]:<7} min={min(values):<7} max={max(values)}")
+
+def has_proc_net():
+    """Return True when the native /proc/net readers can be used."""
+    return os.path.exists(f"{PROC_NET}/tcp")
 
 def get_input(prompt, min_value=None, max_value=None):
     """
@@ -170,38 +1305,63 @@ def nslookup_menu():
         print("6. Lookup PTR Records (-type=PTR)")
         print("7. Lookup SOA Records (-type=SOA)")
         print("8. Specify DNS Server for Lookup")
-        print(f"{RED}9. Exit to Main Menu (or press 'q' to quit){RESET}")
-        choice = get_input(f"\n{BRIGHT_CYAN}Enter your choice: {RESET}", 1, 9)
+        print("9. Lookup All Record Types")
+        print("10. Bulk Lookup from File")
+        print(f"{RED}11. Exit to Main Menu (or press 'q' to quit){RESET}")
+        choice = get_input(f"\n{BRIGHT_CYAN}Enter your choice: {RESET}", 1, 11)
 
         if choice == 'q':
             break
+        record_types = {2: "CNAME", 3: "NS", 4: "MX", 5: "AAAA", 6: "PTR", 7: "SOA"}
+        server = None
         if choice == 1:
-            domain = input("\nEnter the domain name or IP address: ")
-            execute_command(f"nslookup {domain}", f"Running: nslookup {domain}")
-        elif choice == 2:
-            domain = input("\nEnter the domain name for CNAME lookup: ")
-            execute_command(f"nslookup -type=CNAME {domain}", f"Running: nslookup -type=CNAME {domain}")
-        elif choice == 3:
-            domain = input("\nEnter the domain name for NS lookup: ")
-            execute_command(f"nslookup -type=NS {domain}", f"Running: nslookup -type=NS {domain}")
-        elif choice == 4:
-            domain = input("\nEnter the domain name for MX lookup: ")
-            execute_command(f"nslookup -type=MX {domain}", f"Running: nslookup -type=MX {domain}")
-        elif choice == 5:
-            domain = input("\nEnter the domain name for AAAA lookup: ")
-            execute_command(f"nslookup -type=AAAA {domain}", f"Running: nslookup -type=AAAA {domain}")
-        elif choice == 6:
-            domain = input("\nEnter the domain name for PTR lookup: ")
-            execute_command(f"nslookup -type=PTR {domain}", f"Running: nslookup -type=PTR {domain}")
-        elif choice == 7:
-            domain = input("\nEnter the domain name for SOA lookup: ")
-            execute_command(f"nslookup -type=SOA {domain}", f"Running: nslookup -type=SOA {domain}")
+            domain = input("\nEnter the domain name or IP address: ").strip()
+            try:
+                ipaddress.ip_address(domain)
+                qtypes = ("PTR",)
+            except ValueError:
+                qtypes = ("A", "AAAA")
+        elif choice in record_types:
+            qtypes = (record_types[choice],)
+            domain = input(f"\nEnter the domain name for {qtypes[0]} lookup: ").strip()
         elif choice == 8:
-            dns_server = input("\nEnter the DNS server address: ")
-            domain = input("\nEnter the domain name for lookup: ")
-            execute_command(f"nslookup {domain} {dns_server}", f"Running: nslookup {domain} {dns_server}")
+            server = input("\nEnter the DNS server address: ").strip()
+            domain = input("\nEnter the domain name for lookup: ").strip()
+            qtypes = ("A", "AAAA")
         elif choice == 9:
+            domain = input("\nEnter the domain name for lookup: ").strip()
+            qtypes = ("A", "AAAA", "CNAME", "NS", "MX", "SOA")
+        elif choice == 10:
+            input_path = input("\nEnter the file of domains (one per line): ").strip()
+            output_path = input("\nEnter the output filename (e.g., results.tsv): ").strip()
+            qtypes = tuple(t for t in input("\nRecord types (default A): ").upper().replace(",", " ").split()) or ("A",)
+            started = time.perf_counter()
+            try:
+                limit = int(input(f"\nQueries in flight (default {MAX_DNS_IN_FLIGHT}): ") or MAX_DNS_IN_FLIGHT)
+                unknown = [t for t in qtypes if t not in DNS_TYPES]
+                if unknown:
+                    raise ValueError(f"unknown record type(s) {', '.join(unknown)}")
+                count, statuses, elapsed = bulk_resolve(input_path, output_path, qtypes, limit)
+            except (OSError, ValueError) as e:
+                record_action(f"nslookup --bulk {input_path}", started, 1)
+                print(f"\n{BRIGHT_RED}Bulk lookup failed: {e}{RESET}")
+            else:
+                # NXDOMAIN is an answer in a bulk run; only queries that got no reply count as failures
+                failed = sum(n for status, n in statuses.items() if status not in DNS_RCODES.values() and not status.startswith("RCODE"))
+                command_history.append(f"nslookup --bulk {input_path}", elapsed, int(failed > 0))
+                summary = ", ".join(f"{status}: {n}" for status, n in sorted(statuses.items()))
+                print(f"\n{BRIGHT_GREEN}{count} answers in {elapsed:.1f}s ({count / max(elapsed, 1e-9):.0f}/s) "
+                      f"written to {output_path}.{RESET}\n{summary}")
+            pause()
+            continue
+        elif choice == 11:
             break
+        resolver = get_resolver(server)
+        started = time.perf_counter()
+        answers = resolver.run(resolver.resolve(domain, qtypes))
+        record_action(f"nslookup {' '.join(f'-type={t}' for t in qtypes)} {domain}" + (f" {server}" if server else ""),
+                      started, dns_exit_status(answers))
+        print_dns_answers(answers)
         pause()
 
 def traceroute_menu():
@@ -234,21 +1394,45 @@ def ping_menu():
         print(f"{YELLOW}Ping Options:{RESET}")
         print("1. Standard Ping")
         print("2. Custom Ping (Specify packet size, count, and timeout)")
-        print(f"{RED}3. Exit to Main Menu (or press 'q' to quit){RESET}")
-        choice = get_input(f"\n{BRIGHT_CYAN}Enter your choice: {RESET}", 1, 3)
+        print("3. Sweep Hosts or Subnet (e.g., 192.168.1.0/24 10.0.0.1 example.com)")
+        print(f"{RED}4. Exit to Main Menu (or press 'q' to quit){RESET}")
+        choice = get_input(f"\n{BRIGHT_CYAN}Enter your choice: {RESET}", 1, 4)
 
         if choice == 'q':
             break
         if choice == 1:
-            host = input("\nEnter the host to ping: ")
-            execute_command(f"ping {host}", f"Running: ping {host}")
+            host = input("\nEnter the host to ping: ").strip()
+            started = time.perf_counter()
+            results = sweep([host])
+            # Like ping itself: success as soon as any reply came back
+            record_action(f"ping {host}", started, int(not results[0].reachable))
+            print_ping_results(results)
         elif choice == 2:
-            host = input("\nEnter the host to ping: ")
-            size = input("\nEnter the packet size (bytes): ")
-            count = input("\nEnter the number of packets to send: ")
-            timeout = input("\nEnter the timeout in milliseconds: ")
-            execute_command(f"ping {host} -l {size} -n {count} -w {timeout}", f"Running: ping {host} -l {size} -n {count} -w {timeout}")
+            host = input("\nEnter the host to ping: ").strip()
+            try:
+                size = int(input("\nEnter the packet size (bytes): "))
+                count = int(input("\nEnter the number of packets to send: "))
+                timeout = int(input("\nEnter the timeout in milliseconds: ")) / 1000
+            except ValueError:
+                print(f"{BRIGHT_RED}Packet size, count and timeout must be numbers.{RESET}")
+            else:
+                started = time.perf_counter()
+                results = sweep([host], count=count, timeout=timeout, size=size)
+                record_action(f"ping {host} -l {size} -n {count} -w {int(timeout * 1000)}", started,
+                              int(not results[0].reachable))
+                print_ping_results(results)
         elif choice == 3:
+            targets = input("\nEnter hosts and/or CIDR blocks separated by spaces: ").split()
+            started = time.perf_counter()
+            try:
+                results = sweep(targets, count=3, interval=0.2)
+            except ValueError as e:
+                record_action(f"sweep {' '.join(targets)}", started, 1)
+                print(f"{BRIGHT_RED}Invalid target: {e}{RESET}")
+            else:
+                record_action(f"sweep {' '.join(targets)}", started, int(not any(r.reachable for r in results)))
+                print_ping_results(results, only_reachable=len(results) > 1)
+        elif choice == 4:
             break
         pause()
 
@@ -266,7 +1450,13 @@ def arp_menu():
         if choice == 'q':
             break
         if choice == 1:
-            execute_command("arp -a", "Running: arp -a")
+            if has_proc_net():
+                started = time.perf_counter()
+                entries = select_rows(read_arp_table(), sort_by="device,address")
+                record_action("arp -a", started, 0)
+                print_arp_table(entries)
+            else:
+                execute_command("arp -a", "Running: arp -a")
         elif choice == 2:
             ip_address = input("\nEnter the IP address for the ARP entry: ")
             mac_address = input("\nEnter the MAC address for the ARP entry: ")
@@ -288,23 +1478,58 @@ def netstat_menu():
         print("3. Display Routing Table (-r)")
         print("4. Display TCP Connections")
         print("5. Display UDP Connections")
-        print(f"{RED}6. Exit to Main Menu (or press 'q' to quit){RESET}")
-        choice = get_input(f"\n{BRIGHT_CYAN}Enter your choice: {RESET}", 1, 6)
+        print("6. Filter Connections (state, port, address)")
+        print("7. Watch Connections (live open/close/state changes)")
+        print(f"{RED}8. Exit to Main Menu (or press 'q' to quit){RESET}")
+        choice = get_input(f"\n{BRIGHT_CYAN}Enter your choice: {RESET}", 1, 8)
 
         if choice == 'q':
             break
+        if choice == 8:
+            break
+        commands = {1: "netstat", 2: "netstat -an", 3: "netstat -r", 4: "netstat -t", 5: "netstat -u"}
+        if not has_proc_net():
+            if choice in commands:
+                execute_command(commands[choice], f"Running: {commands[choice]}")
+            else:
+                print(f"\n{BRIGHT_RED}Connection filtering and watching need /proc/net (Linux).{RESET}")
+            pause()
+            continue
+        command = commands.get(choice, "netstat --watch" if choice == 7 else "netstat --filter")
+        started = time.perf_counter()
+        exit_status = 0
         if choice == 1:
-            execute_command("netstat", "Running: netstat")
+            print_connections(select_rows(read_connections(), sort_by="proto,local_port", state="ESTABLISHED"))
         elif choice == 2:
-            execute_command("netstat -an", "Running: netstat -an")
+            connections = read_connections()
+            print_connections(select_rows(connections, sort_by="proto,local_port", state="LISTEN")
+                              + select_rows(connections, sort_by="proto,local_port", proto="udp", state="UNCONN")
+                              + select_rows(connections, sort_by="proto,local_port", proto="udp6", state="UNCONN"))
         elif choice == 3:
-            execute_command("netstat -r", "Running: netstat -r")
+            print_routes(read_routes())
         elif choice == 4:
-            execute_command("netstat -t", "Running: netstat -t")
+            print_connections(select_rows(read_connections(("tcp",)), sort_by="state,local_port"))
         elif choice == 5:
-            execute_command("netstat -u", "Running: netstat -u")
+            print_connections(select_rows(read_connections(("udp",)), sort_by="local_port"))
         elif choice == 6:
-            break
+            state = input("\nState (e.g., ESTABLISHED, LISTEN; blank for any): ").strip() or None
+            port = input("Port (blank for any): ").strip() or None
+            address = input("Address or CIDR (blank for any): ").strip() or None
+            sort_by = input("Sort by (state, local_port, remote_address, ...; default local_port): ").strip() or "local_port"
+            started = time.perf_counter()
+            try:
+                print_connections(select_rows(read_connections(), sort_by=sort_by, state=state, port=port, address=address))
+            except (ValueError, AttributeError) as e:
+                exit_status = 1
+                print(f"\n{BRIGHT_RED}Invalid filter: {e}{RESET}")
+        elif choice == 7:
+            try:
+                interval = float(input(f"\nPoll interval in seconds (default {WATCH_INTERVAL}): ") or WATCH_INTERVAL)
+            except ValueError:
+                interval = WATCH_INTERVAL
+            started = time.perf_counter()
+            watch_connections(interval)
+        record_action(command, started, exit_status)
         pause()
 
 def route_menu():
@@ -321,7 +1546,13 @@ def route_menu():
         if choice == 'q':
             break
         if choice == 1:
-            execute_command("route print", "Running: route print")
+            if has_proc_net():
+                started = time.perf_counter()
+                routes = read_routes()
+                record_action("route print", started, 0)
+                print_routes(routes)
+            else:
+                execute_command("route print", "Running: route print")
         elif choice == 2:
             destination = input("\nEnter the destination IP address: ")
             subnet_mask = input("\nEnter the subnet mask: ")
@@ -336,10 +1567,17 @@ def route_menu():
 
 def test_network_connection():
     """Test network connectivity."""
-    execute_command("ping 8.8.8.8 -n 4", "Testing network connection...")
+    print(f"\n{BRIGHT_GREEN}Testing network connection...{RESET}")
+    results = sweep(["8.8.8.8", "1.1.1.1"])
+    print_ping_results(results)
+    logging.info(f"Network connection test: {sum(r.reachable for r in results)} of {len(results)} hosts reachable")
 
 def test_network_speed():
     """Test network speed using speedtest-cli."""
+    if speedtest is None:
+        print(f"\n{BRIGHT_RED}Network speed test needs speedtest-cli (pip install speedtest-cli).{RESET}")
+        pause()
+        return
     try:
         print(f"\n{BRIGHT_GREEN}Testing network speed...{RESET}")
         st = speedtest.Speedtest()
@@ -352,18 +1590,184 @@ def test_network_speed():
         print(f"\n{BRIGHT_RED}Error: {e}{RESET}")
     pause()
 
+class Check:
+    """One step of the troubleshooting wizard and its outcome."""
+
+    __slots__ = ("name", "function", "depends", "hint", "status", "detail", "started", "duration")
+
+    def __init__(self, name, function, depends=(), hint=""):
+        self.name = name
+        self.function = function  # async function(context) -> (ok, detail)
+        self.depends = tuple(depends)
+        self.hint = hint  # what a failure most likely means
+        self.status = "pending"
+        self.detail = ""
+        self.started = 0.0
+        self.duration = 0.0
+
+async def check_interfaces(context):
+    """Pass if a non-loopback interface is up and running."""
+    if os.path.isdir("/sys/class/net"):
+        up = []
+        for name in sorted(os.listdir("/sys/class/net")):
+            try:
+                with open(f"/sys/class/net/{name}/flags") as f:
+                    flags = int(f.read(), 16)
+                with open(f"/sys/class/net/{name}/operstate") as f:
+                    state = f.read().strip()
+            except (OSError, ValueError):
+                continue
+            # Administratively up (IFF_UP), not loopback (IFF_LOOPBACK), and the link is
+            # up; point-to-point devices such as tun report their state as "unknown"
+            if flags & 0x01 and not flags & 0x08 and state in ("up", "unknown"):
+                up.append(name)
+        context["interfaces"] = up
+        return bool(up), f"up: {', '.join(up)}" if up else "no interface is up"
+    context["interfaces"] = None
+    return True, "interface state unavailable on this platform"
+
+def _source_address(target="192.0.2.1"):
+    """Return the local address the OS would route target from, without sending anything."""
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.connect((target, 9))
+        return sock.getsockname()[0]
+
+async def check_routes(context):
+    """Pass if there is a usable default route whose gateway is on a connected network."""
+    if not has_proc_net():
+        try:
+            address = _source_address()
+        except OSError as e:
+            return False, f"no route out: {e.strerror or e}"
+        context["gateway"] = None
+        return True, f"traffic leaves from {address}"
+    routes = read_routes()
+    defaults = sorted((r for r in routes if r.is_default and r.flags & 0x0001 and not r.flags & 0x0200),
+                      key=lambda r: (r.destination.version, r.metric))
+    interfaces = context.get("interfaces")
+    if interfaces is not None:
+        defaults = [r for r in defaults if r.device in interfaces]
+    if not defaults:
+        return False, "no default route through an interface that is up"
+    route = defaults[0]
+    if not route.flags & 0x0002:
+        context["gateway"] = None
+        return True, f"default route is directly on {route.device}"
+    on_link = [r for r in routes if not r.is_default and r.device == route.device and route.gateway in r.destination]
+    if not on_link and route.gateway.version == 4:
+        return False, f"gateway {route.gateway} is not on any network attached to {route.device}"
+    context["gateway"] = str(route.gateway)
+    return True, f"default via {route.gateway} dev {route.device} metric {route.metric}"
+
+async def check_gateway(context):
+    """Pass if the default gateway answers probes."""
+    gateway = context.get("gateway")
+    if not gateway:
+        return True, "no gateway to probe"
+    result = await probe_host(gateway, count=3, interval=0.2, timeout=1.0)
+    stats = result.stats()
+    if not stats:
+        return False, f"{gateway} did not answer ({result.error or f'{result.loss:.0f}% loss'})"
+    return True, f"{gateway} {result.loss:.0f}% loss, avg {stats[1]:.1f} ms ({result.method})"
+
+async def check_dns(context):
+    """Pass if the system nameservers resolve a well-known name (bypassing the cache)."""
+    resolver = DnsResolver()
+    try:
+        answer = await resolver.query(WIZARD_DNS_NAME, "A")
+    finally:
+        resolver.close()
+    if answer.rcode == 0 and answer.records:
+        return True, f"{WIZARD_DNS_NAME} -> {answer.records[-1].value} in {answer.elapsed * 1000:.0f} ms via {', '.join(resolver.servers)}"
+    return False, f"{WIZARD_DNS_NAME}: {answer.status} via {', '.join(resolver.servers)}"
+
+async def check_external(context):
+    """Pass if any well-known external host is reachable."""
+    results = await sweep_async(WIZARD_EXTERNAL_HOSTS, count=3, interval=0.2, timeout=1.0)
+    up = [r for r in results if r.reachable]
+    if not up:
+        return False, f"none of {', '.join(WIZARD_EXTERNAL_HOSTS)} answered"
+    return True, ", ".join(f"{r.host} avg {r.stats()[1]:.1f} ms" for r in up)
+
+def build_wizard_checks():
+    """Return the wizard's checks; each lists the checks it depends on."""
+    return [
+        Check("Interface state", check_interfaces,
+              hint="No network interface is up: check the cable, Wi-Fi or adapter."),
+        Check("Route sanity", check_routes, ["Interface state"],
+              hint="Routing is broken: renew the IP address (IP Configuration menu) or fix the default route."),
+        Check("Gateway reachability", check_gateway, ["Route sanity"],
+              hint="The router does not answer: check the local link and the router itself."),
+        Check("DNS resolution", check_dns, ["Route sanity"],
+              hint="Name resolution fails: flush the DNS cache or try another DNS server."),
+        Check("External reachability", check_external, ["Gateway reachability"],
+              hint="The local network works but the internet does not: likely an ISP or upstream problem."),
+    ]
+
+async def run_checks(checks, timeout=WIZARD_CHECK_TIMEOUT, on_done=None):
+    """Run checks concurrently, each as soon as its dependencies pass.
+
+    A check whose dependency fails or is skipped is skipped too, so the total
+    time is that of the slowest dependency chain rather than the sum of all
+    checks. Dependencies must be listed before the checks that use them.
+    """
+    by_name = {}
+    for check in checks:
+        missing = [name for name in check.depends if name not in by_name]
+        if missing:
+            raise ValueError(f"{check.name} depends on unknown or later check(s): {', '.join(missing)}")
+        by_name[check.name] = check
+    context = {}
+    tasks = {}
+    origin = time.perf_counter()
+
+    async def run(check):
+        for name in check.depends:
+            await tasks[name]
+        blocked = [name for name in check.depends if by_name[name].status != "pass"]
+        check.started = time.perf_counter() - origin
+        if blocked:
+            check.status = "skip"
+            check.detail = f"needs {', '.join(blocked)}"
+        else:
+            start = time.perf_counter()
+            try:
+                ok, check.detail = await asyncio.wait_for(check.function(context), timeout)
+            except asyncio.TimeoutError:
+                ok, check.detail = False, f"timed out after {timeout}s"
+            except (OSError, ValueError) as e:
+                ok, check.detail = False, str(e)
+            check.duration = time.perf_counter() - start
+            check.status = "pass" if ok else "fail"
+        if on_done:
+            on_done(check)
+
+    for check in checks:
+        tasks[check.name] = asyncio.ensure_future(run(check))
+    await asyncio.gather(*tasks.values())
+    return time.perf_counter() - origin
+
+def print_check(check):
+    """Print one finished check as a report line."""
+    color = {"pass": BRIGHT_GREEN, "fail": BRIGHT_RED, "skip": BRIGHT_YELLOW}[check.status]
+    print(f"{color}{check.status.upper():<5}{RESET} {check.name:<24} {check.duration * 1000:>8.0f} ms  {check.detail}")
+
 def network_troubleshooting_wizard():
-    """Guide users through common network troubleshooting steps."""
-    print(f"\n{BRIGHT_GREEN}Starting Network Troubleshooting Wizard...{RESET}")
-    print(f"{CYAN}1. Checking network connectivity...{RESET}")
-    execute_command("ping 8.8.8.8 -n 4", "Testing connectivity to Google DNS...")
-    print(f"{CYAN}2. Flushing DNS cache...{RESET}")
-    execute_command("ipconfig /flushdns", "Flushing DNS cache...")
-    print(f"{CYAN}3. Renewing IP address...{RESET}")
-    execute_command("ipconfig /renew", "Renewing IP address...")
-    print(f"{CYAN}4. Displaying active connections...{RESET}")
-    execute_command("netstat -an", "Displaying active connections...")
-    print(f"\n{BRIGHT_GREEN}Troubleshooting complete!{RESET}")
+    """Diagnose connectivity with concurrent, dependency-aware checks."""
+    print(f"\n{BRIGHT_GREEN}Starting Network Troubleshooting Wizard...{RESET}\n")
+    checks = build_wizard_checks()
+    total = asyncio.run(run_checks(checks, on_done=print_check))
+    failed = [check for check in checks if check.status == "fail"]
+    print(f"\n{BOLD}Diagnosis took {total:.2f}s "
+          f"(checks add up to {sum(check.duration for check in checks):.2f}s).{RESET}")
+    if failed:
+        print(f"{BRIGHT_RED}Verdict: {failed[0].hint}{RESET}")
+        for check in failed[1:]:
+            print(f"{BRIGHT_RED}Also: {check.hint}{RESET}")
+    else:
+        print(f"{BRIGHT_GREEN}Verdict: no problems found.{RESET}")
+    command_history.append("troubleshoot", total, len(failed))
+    logging.info(f"Troubleshooting wizard: {', '.join(f'{c.name}={c.status}' for c in checks)} in {total:.2f}s")
     pause()
 
 def reset_network_settings():
@@ -375,25 +1779,45 @@ def reset_network_settings():
     pause()
 
 def save_output_to_file():
-    """Save the output of a command to a file."""
-    command = input("\nEnter the command to save output for: ").strip()
+    """Save the output of one or more commands to a file."""
+    commands = split_commands(input("\nEnter the command(s) to save output for (separate several with ';'): "))
     filename = input("\nEnter the filename to save output (e.g., output.txt): ").strip()
-    try:
+    # Independent commands run concurrently; their outputs are written in the order given
+    results = run_commands(commands, stream=False)
+    saved = [result for result in results if result.ok]
+    if saved:
         with open(filename, "w") as f:
-            subprocess.run(command, shell=True, check=True, stdout=f, text=True)
-        print(f"\n{BRIGHT_GREEN}Output saved to {filename}{RESET}")
-    except subprocess.CalledProcessError as e:
-        print(f"\n{BRIGHT_RED}Command failed: {e}{RESET}")
+            for result in saved:
+                if len(commands) > 1:
+                    f.write(f"===== {result.command} =====\n")
+                f.write(result.stdout)
+        print(f"\n{BRIGHT_GREEN}Output of {len(saved)} of {len(results)} command(s) saved to {filename}{RESET}")
     pause()
 
+def print_history_rows(rows):
+    """Print history entries with their time, duration and exit status."""
+    for command, started, duration, exit_status in rows:
+        when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(started))
+        took = f"{duration:.2f}s" if duration is not None else "-"
+        status = "-" if exit_status is None else str(exit_status)
+        color = BRIGHT_RED if exit_status not in (None, 0) else ""
+        print(f"{color}{when}  {took:>9}  exit {status:>4}  {command}{RESET if color else ''}")
+
 def search_command_history():
     """Search the command history for specific commands."""
-    search_term = input("\nEnter a term to search in command history: ").strip()
-    matches = [cmd for cmd in command_history if search_term.lower() in cmd.lower()]
+    search_term = input("\nEnter a term to search in command history (blank for recent): ").strip()
+    if not search_term:
+        matches = command_history.recent()
+        title = "Recent commands"
+    else:
+        matches = command_history.search(search_term)
+        title = "Matching commands"
+        if not matches:
+            matches = command_history.fuzzy_search(search_term)
+            title = "No exact matches; closest commands"
     if matches:
-        print(f"\n{BRIGHT_GREEN}Matching commands:{RESET}")
-        for i, cmd in enumerate(matches, 1):
-            print(f"{i}. {cmd}")
+        print(f"\n{BRIGHT_GREEN}{title}:{RESET}")
+        print_history_rows(matches)
     else:
         print(f"\n{BRIGHT_RED}No matching commands found.{RESET}")
     pause()
@@ -404,18 +1828,18 @@ def display_help_tooltips():
     print(f"{YELLOW}Help Tooltips:{RESET}")
     tooltips = {
         "ipconfig": "Displays or configures network interface settings.",
-        "nslookup": "Queries DNS records for a domain or IP address.",
+        "nslookup": "Queries DNS records for a domain or IP address, with caching and bulk lookups.",
         "tracert": "Traces the route to a host.",
-        "ping": "Tests connectivity to a host.",
+        "ping": "Tests connectivity to a host, or sweeps many hosts and CIDR blocks at once.",
         "arp": "Displays or modifies the ARP table.",
         "netstat": "Displays network connections and statistics.",
         "route": "Displays or modifies the network routing table.",
         "test_network_connection": "Tests internet connectivity.",
         "network_speed_test": "Tests network speed using speedtest-cli.",
-        "network_troubleshooting_wizard": "Guides through common network troubleshooting steps.",
+        "network_troubleshooting_wizard": "Checks interfaces, routes, gateway, DNS and internet access concurrently and explains failures.",
         "reset_network_settings": "Resets TCP/IP stack and Winsock.",
-        "save_output_to_file": "Saves the output of a command to a file.",
-        "search_command_history": "Searches the command history for specific commands.",
+        "save_output_to_file": "Saves the output of one or more commands (run concurrently) to a file.",
+        "search_command_history": "Searches the saved command history of all sessions, with fuzzy matching.",
         "help_tooltips": "Displays tooltips for menu options."
     }
     for option, tooltip in tooltips.items():
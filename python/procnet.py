@@ -0,0 +1,27 @@
+"""Helpers for the Linux /proc/net tables, shared by taskmaneger.py and networkTools.py."""
+import socket
+from functools import lru_cache
+
+TCP_STATES = {
+    "01": "ESTABLISHED", "02": "SYN_SENT", "03": "SYN_RECV", "04": "FIN_WAIT1",
+    "05": "FIN_WAIT2", "06": "TIME_WAIT", "07": "CLOSE", "08": "CLOSE_WAIT",
+    "09": "LAST_ACK", "0A": "LISTEN", "0B": "CLOSING", "0C": "NEW_SYN_RECV",
+}
+SOCKET_TABLES = (("tcp", socket.AF_INET), ("tcp6", socket.AF_INET6), ("udp", socket.AF_INET), ("udp6", socket.AF_INET6))
+
+@lru_cache(maxsize=65536)
+def decode_proc_address(text, family):
+    """Decode a /proc/net hex address such as 0100007F:0035 into (ip, port)."""
+    address, _, port = text.partition(":")
+    raw = bytes.fromhex(address)
+    # The kernel prints each 32-bit word in host (little-endian) order
+    raw = b"".join(raw[i:i + 4][::-1] for i in range(0, len(raw), 4))
+    return socket.inet_ntop(family, raw), int(port, 16)
+
+def read_table(path):
+    """Return the data lines of a /proc/net table, or [] if it is unavailable (e.g. IPv6 disabled)."""
+    try:
+        with open(path) as file:
+            return file.read().splitlines()[1:]
+    except OSError:
+        return []
@@ -0,0 +1,44 @@
+import asyncio
+import sys
+import unittest
+
+import networkTools as nt
+
+
+class SplitCommandsTest(unittest.TestCase):
+    def test_splits_on_semicolons(self):
+        self.assertEqual(nt.split_commands("echo a;echo b ;; "), ["echo a", "echo b"])
+
+    def test_quoted_and_escaped_semicolons_stay_in_the_command(self):
+        self.assertEqual(nt.split_commands('python -c "a; b"; grep \';\' file; echo a\\;b'),
+                         ['python -c "a; b"', "grep ';' file", "echo a\\;b"])
+
+    def test_blank_input_gives_no_commands(self):
+        self.assertEqual(nt.split_commands(" ; "), [])
+
+
+class RunCommandTest(unittest.TestCase):
+    def run_python(self, code, **options):
+        return asyncio.run(nt.run_command([sys.executable, "-c", code], **options))
+
+    def test_lines_longer_than_the_stream_limit(self):
+        lines = []
+        result = self.run_python("print('x' * 3000000); print('end')",
+                                 on_output=lambda name, line: lines.append(len(line)))
+        self.assertTrue(result.ok, result.describe())
+        self.assertEqual(lines, [3000001, 4])
+        self.assertEqual(result.stdout_bytes, 3000005)
+
+    def test_unterminated_last_line_and_stderr(self):
+        result = self.run_python("import sys; sys.stdout.write('a\\nb'); sys.stderr.write('oops\\n')")
+        self.assertEqual((result.stdout, result.stderr), ("a\nb", "oops\n"))
+
+    def test_timeout_kills_the_child(self):
+        result = self.run_python("import time; time.sleep(30)", timeout=0.2)
+        self.assertTrue(result.timed_out)
+        self.assertIsNotNone(result.returncode)
+        self.assertLess(result.duration, 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
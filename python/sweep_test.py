@@ -0,0 +1,83 @@
+import socket
+import unittest
+from unittest import mock
+
+import networkTools as nt
+
+
+class PingResultTest(unittest.TestCase):
+    def test_stats(self):
+        result = nt.PingResult("host")
+        result.sent = 4
+        result.rtts = [1.0, 3.0, 2.0]
+        self.assertEqual(result.stats(), (1.0, 2.0, 3.0, 3.0, 1.5))
+        self.assertEqual(result.loss, 25.0)
+        self.assertTrue(result.reachable)
+
+    def test_no_replies(self):
+        result = nt.PingResult("host")
+        self.assertIsNone(result.stats())
+        self.assertEqual(result.loss, 100.0)
+        self.assertFalse(result.reachable)
+
+
+class ExpandTargetsTest(unittest.TestCase):
+    def test_cidr_blocks_skip_network_and_broadcast(self):
+        self.assertEqual(list(nt.expand_targets(["127.0.0.0/30"])), ["127.0.0.1", "127.0.0.2"])
+
+    def test_small_blocks_and_names_pass_through(self):
+        self.assertEqual(list(nt.expand_targets(["10.0.0.5/32", "10.0.0.8/31", "localhost"])),
+                         ["10.0.0.5", "10.0.0.8", "10.0.0.9", "localhost"])
+
+
+class SweepTest(unittest.TestCase):
+    def setUp(self):
+        self.listener = socket.socket()
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen(64)
+        self.port = self.listener.getsockname()[1]
+        # Force the TCP fallback so the tests do not depend on ping_group_range
+        patcher = mock.patch.dict(nt._icmp_support, {socket.AF_INET: False})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.listener.close()
+
+    def test_tcp_fallback_against_local_listener(self):
+        result, = nt.sweep(["127.0.0.1"], count=3, interval=0, timeout=1.0, port=self.port)
+        self.assertEqual(result.method, f"tcp/{self.port}")
+        self.assertEqual((result.sent, result.received), (3, 3))
+        self.assertIsNone(result.error)
+        self.assertEqual(result.loss, 0.0)
+
+    def test_refused_connection_counts_as_reachable(self):
+        closed = socket.socket()
+        closed.bind(("127.0.0.1", 0))
+        port = closed.getsockname()[1]
+        closed.close()
+        result, = nt.sweep(["127.0.0.1"], count=2, interval=0, timeout=1.0, port=port)
+        self.assertTrue(result.reachable)
+        self.assertEqual(result.received, 2)
+
+    def test_sweep_probes_every_host_in_a_block(self):
+        results = nt.sweep(["127.0.0.0/29"], count=1, interval=0, timeout=1.0, port=self.port, limit=2)
+        self.assertEqual(sorted(r.address for r in results), [f"127.0.0.{i}" for i in range(1, 7)])
+        self.assertTrue(all(r.reachable for r in results))
+
+    def test_malformed_name_does_not_abort_the_sweep(self):
+        results = {r.host: r for r in nt.sweep(["a..b", "127.0.0.1"], count=1, interval=0, timeout=1.0, port=self.port)}
+        self.assertEqual(results["a..b"].error, "unresolved (invalid hostname)")
+        self.assertFalse(results["a..b"].reachable)
+        self.assertTrue(results["127.0.0.1"].reachable)
+
+    def test_icmp_echo_on_loopback(self):
+        nt._icmp_support.pop(socket.AF_INET)
+        if not nt.icmp_available(socket.AF_INET):
+            self.skipTest("unprivileged ICMP sockets are not permitted (net.ipv4.ping_group_range)")
+        result, = nt.sweep(["127.0.0.1"], count=2, interval=0, timeout=1.0)
+        self.assertEqual((result.method, result.received), ("icmp", 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
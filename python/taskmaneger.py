@@ -4,7 +4,52 @@ import subprocess
 import time
 import platform
 import sys
+import csv
+import re
+import shutil
+import select
+import shlex
+import operator
+import json
+import argparse
+import struct
+import zlib
+import gzip
+import io
+import bisect
+import threading
+import logging
+import urllib.request
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
 from datetime import datetime
+from operator import attrgetter
+from procnet import SOCKET_TABLES, TCP_STATES, decode_proc_address, read_table
+
+try:
+    import pwd  # Only available on POSIX; used by the /proc backend
+except ImportError:
+    pwd = None
+
+try:
+    import termios  # POSIX raw keyboard input for the built-in selector
+    import tty
+except ImportError:
+    termios = tty = None
+
+try:
+    import msvcrt  # Windows keyboard input for the built-in selector
+except ImportError:
+    msvcrt = None
+
+try:
+    import numpy as np  # Optional; speeds up history queries
+except ImportError:
+    np = None
 
 # ANSI Color codes for main script output (not for fzf)
 RESET = "\033[0m"
@@ -15,66 +60,1512 @@ YELLOW = "\033[33m"
 CYAN = "\033[36m"
 MAGENTA = "\033[35m"
 BLUE = "\033[34m"
+REVERSE = "\033[7m"
+
+# ANSI control sequences used by the differential renderer
+CLEAR = "\033[2J\033[H"
+CLEAR_LINE = "\033[K"
+HIDE_CURSOR = "\033[?25l"
+SHOW_CURSOR = "\033[?25h"
+ANSI_PATTERN = re.compile(r"\033\[[0-9;?]*[A-Za-z]")
 
 def clear_screen():
     """Clear the terminal screen."""
     if platform.system() == "Windows":
         os.system("cls")  # Clear screen for Windows
     else:
-        os.system("clear")  # Clear screen for macOS/Linux
+        # ANSI clear for macOS/Linux; avoids forking a shell on every refresh
+        sys.stdout.write(CLEAR)
+        sys.stdout.flush()
 
-def get_process_list(sort_by="pid", filter_by=None, filter_value=None):
-    """Collect a list of running processes with optional sorting and filtering."""
-    processes = []
-    for proc in psutil.process_iter(['pid', 'name', 'username', 'status', 'memory_info', 'cpu_percent', 'create_time']):
+def fit_line(line, width):
+    """Truncate a line to width visible characters, keeping ANSI codes intact."""
+    if len(ANSI_PATTERN.sub("", line)) <= width:
+        return line
+    parts = []
+    visible = 0
+    position = 0
+    for match in ANSI_PATTERN.finditer(line):
+        text = line[position:match.start()][:max(width - visible, 0)]
+        parts.append(text)
+        visible += len(text)
+        parts.append(match.group())
+        position = match.end()
+    parts.append(line[position:][:max(width - visible, 0)])
+    return "".join(parts)
+
+class FrameRenderer:
+    """In-place terminal renderer that rewrites only the lines that changed.
+
+    The previous frame is kept so each render emits cursor moves for changed
+    rows only, batched into a single write. Frames are clipped to the
+    viewport; a resize forces one full redraw.
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self._previous = []
+        self._size = None
+
+    def viewport(self):
+        """Return the terminal size as (rows, columns)."""
+        size = shutil.get_terminal_size()
+        return size.lines, size.columns
+
+    def reset(self):
+        """Forget the previous frame so the next render redraws everything."""
+        self._previous = []
+        self._size = None
+
+    def render(self, lines):
+        """Draw a frame and return the number of rows that were rewritten."""
+        height, width = self.viewport()
+        frame = [fit_line(line, width) for line in lines[:height]]
+        parts = []
+        if (height, width) != self._size:
+            parts.append(CLEAR)
+            self._previous = []
+            self._size = (height, width)
+        previous = self._previous
+        changed = 0
+        for row, line in enumerate(frame):
+            if row >= len(previous) or previous[row] != line:
+                parts.append(f"\033[{row + 1};1H{line}{CLEAR_LINE}")
+                changed += 1
+        for row in range(len(frame), len(previous)):
+            parts.append(f"\033[{row + 1};1H{CLEAR_LINE}")  # Blank rows left over from a longer frame
+        if parts:
+            parts.append(f"\033[{min(len(frame) + 1, height)};1H")
+            self.stream.write("".join(parts))
+            self.stream.flush()
+        self._previous = frame
+        return changed
+
+class ProcessRecord:
+    """Compact, typed snapshot of a single process."""
+    __slots__ = ("pid", "name", "username", "status", "rss", "cpu_percent", "create_time", "ppid")
+
+    def __init__(self, pid, name, username, status, rss, cpu_percent, create_time, ppid=0):
+        self.pid = pid
+        self.name = name
+        self.username = username
+        self.status = status
+        self.rss = rss  # Resident set size in bytes
+        self.cpu_percent = cpu_percent
+        self.create_time = create_time  # Seconds since the epoch
+        self.ppid = ppid
+
+    @property
+    def key(self):
+        """Identity of the process that survives PID reuse."""
+        return (self.pid, self.create_time)
+
+    @property
+    def memory_mb(self):
+        return self.rss / (1024 * 1024)
+
+    def as_row(self):
+        """Return the record as a tuple in CSV column order."""
+        return (
+            self.pid,
+            self.name,
+            self.username,
+            self.status,
+            f"{self.memory_mb:.2f}",
+            f"{self.cpu_percent:.1f}",
+            format_create_time(self.create_time),
+        )
+
+    def as_dict(self):
+        """Return the record as a JSON-serializable dict with raw units."""
+        return {
+            "pid": self.pid,
+            "name": self.name,
+            "username": self.username,
+            "status": self.status,
+            "rss": self.rss,
+            "cpu_percent": self.cpu_percent,
+            "create_time": self.create_time,
+            "ppid": self.ppid,
+        }
+
+    def __repr__(self):
+        return f"ProcessRecord(pid={self.pid}, name={self.name!r}, rss={self.rss}, cpu={self.cpu_percent})"
+
+CSV_HEADER = ("PID", "Name", "Username", "Status", "Memory Usage (MB)", "CPU Usage (%)", "Creation Time")
+
+# Sort keys work on typed fields; the boolean marks descending order
+SORT_KEYS = {
+    "pid": (attrgetter("pid"), False),
+    "name": (lambda record: record.name.lower(), False),
+    "memory": (attrgetter("rss"), True),
+    "cpu": (attrgetter("cpu_percent"), True),
+}
+
+def format_create_time(create_time):
+    """Format a process creation timestamp for display."""
+    return datetime.fromtimestamp(create_time).strftime('%Y-%m-%d %H:%M:%S')
+
+def format_process_entry(record):
+    """Format a process record as a display row."""
+    return (
+        f"{record.pid:<8} | "  # PID (left-aligned, 8 characters)
+        f"{record.name:<20} | "  # Name (left-aligned, 20 characters)
+        f"{record.username:<15} | "  # Username (left-aligned, 15 characters)
+        f"{record.status:<10} | "  # Status (left-aligned, 10 characters)
+        f"{record.memory_mb:>8.2f} MB | "  # Memory usage (right-aligned, 8 characters)
+        f"{record.cpu_percent:>6.1f}% | "  # CPU usage (right-aligned, 6 characters)
+        f"{format_create_time(record.create_time)}"  # Creation time
+    )
+
+def format_process_entries(records, limit=None, columns=None):
+    """Format only the records that will actually be shown.
+
+    columns is an optional LazyColumns whose values are appended to each
+    row; they are fetched only for these rows.
+    """
+    if limit is not None:
+        records = records[:limit]
+    if columns is None or not columns.columns:
+        return [format_process_entry(record) for record in records]
+    return [f"{format_process_entry(record)} | {columns.format(record)}" for record in records]
+
+def _count_connections(proc):
+    # net_connections() replaced connections() in psutil 6
+    method = getattr(proc, "net_connections", None) or proc.connections
+    return len(method())
+
+def _format_io(proc):
+    counters = proc.io_counters()
+    return f"R {counters.read_bytes / (1024 * 1024):.1f} MB / W {counters.write_bytes / (1024 * 1024):.1f} MB"
+
+def _count_open_files(proc):
+    # File descriptors on POSIX, handles on Windows
+    return proc.num_fds() if hasattr(proc, "num_fds") else proc.num_handles()
+
+# Optional columns that are too expensive to fetch for every process: name -> (fetch, width)
+LAZY_COLUMNS = {
+    "cmdline": (lambda proc: " ".join(proc.cmdline()).replace("\n", " "), 60),
+    "files": (_count_open_files, 6),
+    "io": (_format_io, 28),
+    "threads": (lambda proc: proc.num_threads(), 7),
+    "connections": (_count_connections, 5),
+}
+
+class LazyColumns:
+    """Per-row cache for the expensive optional columns.
+
+    Values are fetched only for the rows that are actually formatted (the
+    viewport, or the selected process) and cached per (pid, create_time) for
+    ttl seconds, so scrolling back and forth does not re-query them.
+    """
+
+    def __init__(self, columns=(), ttl=10.0):
+        unknown = [column for column in columns if column not in LAZY_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown column(s): {', '.join(unknown)}")
+        self.columns = list(columns)
+        self.ttl = ttl
+        self._cache = {}  # (pid, create_time) -> (expires, {column: value})
+        self.fetches = 0  # Process queries made, for diagnostics
+
+    def set_columns(self, columns):
+        self.__init__(columns, self.ttl)
+
+    def forget(self, snapshot):
+        """Drop cached values of exited processes; usable as a snapshot listener."""
+        for record in snapshot.removed:
+            self._cache.pop(record.key, None)
+
+    def values(self, record):
+        """Return {column: value} for a record, fetching only when the cache is stale."""
+        now = time.monotonic()
+        cached = self._cache.get(record.key)
+        if cached and cached[0] > now and all(column in cached[1] for column in self.columns):
+            return cached[1]
+        values = {}
+        try:
+            proc = psutil.Process(record.pid)
+            if abs(proc.create_time() - record.create_time) > 0.01:
+                raise psutil.NoSuchProcess(record.pid)  # PID was reused
+            with proc.oneshot():
+                for column in self.columns:
+                    try:
+                        values[column] = LAZY_COLUMNS[column][0](proc)
+                    except psutil.AccessDenied:
+                        values[column] = "-"
+        except (psutil.NoSuchProcess, psutil.ZombieProcess):
+            values = {column: "-" for column in self.columns}
+        self.fetches += 1
+        self._cache[record.key] = (now + self.ttl, values)
+        return values
+
+    def format(self, record):
+        values = self.values(record)
+        return " | ".join(
+            f"{str(values.get(column, '-')):<{LAZY_COLUMNS[column][1]}.{LAZY_COLUMNS[column][1]}}"
+            for column in self.columns
+        )
+
+    def details(self, record):
+        """Return 'column: value' lines for one process."""
+        values = self.values(record)
+        return [f"{column}: {values.get(column, '-')}" for column in self.columns]
+
+SIZE_UNITS = {"": 1024 ** 2, "B": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+def parse_size(text):
+    """Parse a size such as 500M or 1.5G into bytes; bare numbers are MB like the display."""
+    match = re.fullmatch(r"([0-9.]+)\s*([BKMGT]?)i?B?", text.strip(), re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Invalid size: {text!r}")
+    return float(match.group(1)) * SIZE_UNITS[match.group(2).upper()]
+
+# Filter fields: name -> (record attribute, value parser or None for strings, cost)
+# Lower cost terms are evaluated first so expensive checks only see survivors
+FILTER_FIELDS = {
+    "pid": ("pid", int, 0),
+    "cpu": ("cpu_percent", float, 0),
+    "rss": ("rss", parse_size, 0),
+    "mem": ("rss", parse_size, 0),
+    "memory": ("rss", parse_size, 0),
+    "status": ("status", None, 1),
+    "name": ("name", None, 1),
+    "user": ("username", None, 1),
+    "username": ("username", None, 1),
+}
+FILTER_OPERATORS = {
+    "=": operator.eq, "!=": operator.ne,
+    ">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le,
+}
+FILTER_TERM = re.compile(r"(\w+)(!=|>=|<=|!~|=|~|>|<)(.*)")
+REGEX_COST = 3  # Regex terms run after every plain comparison
+
+class ProcessFilter:
+    """Compiled filter expression; call it with a record to test it."""
+
+    def __init__(self, expression, terms):
+        self.expression = expression
+        self.predicates = [predicate for _, predicate in sorted(terms, key=lambda term: term[0])]
+
+    def __call__(self, record):
+        for predicate in self.predicates:
+            if not predicate(record):
+                return False
+        return True
+
+def _compile_term(term):
+    """Compile one field/operator/value term into (cost, predicate)."""
+    match = FILTER_TERM.fullmatch(term)
+    if not match:
+        raise ValueError(f"Invalid filter term: {term!r}")
+    field, op, raw = match.groups()
+    if field.lower() not in FILTER_FIELDS:
+        raise ValueError(f"Unknown filter field: {field!r}")
+    attr, parse, cost = FILTER_FIELDS[field.lower()]
+    get = attrgetter(attr)
+
+    if op in ("~", "!~"):
         try:
-            pid = proc.info['pid']
-            name = proc.info['name']
-            username = proc.info['username']
-            status = proc.info['status']
-            memory_usage = proc.info['memory_info'].rss / (1024 * 1024)  # Convert to MB
-            cpu_usage = proc.info['cpu_percent']
-            create_time = datetime.fromtimestamp(proc.info['create_time']).strftime('%Y-%m-%d %H:%M:%S')
-
-            # Skip if any critical field is None
-            if pid is None or name is None or username is None or status is None:
+            pattern = re.compile(raw, re.IGNORECASE)
+        except re.error as e:
+            raise ValueError(f"Invalid pattern in {term!r}: {e}")
+        if op == "~":
+            return REGEX_COST, lambda record: pattern.search(str(get(record))) is not None
+        return REGEX_COST, lambda record: pattern.search(str(get(record))) is None
+
+    compare = FILTER_OPERATORS[op]
+    if parse is None:
+        if op not in ("=", "!="):
+            raise ValueError(f"Operator {op} is not supported for {field}")
+        value = raw.lower()
+        return cost, lambda record: compare(get(record).lower(), value)
+    try:
+        value = parse(raw)
+    except ValueError:
+        raise ValueError(f"Invalid value for {field}: {raw!r}")
+    return cost, lambda record: compare(get(record), value)
+
+@lru_cache(maxsize=32)
+def compile_filter(expression):
+    """Compile an expression like 'name~^py user=svc rss>500M cpu>=5 status!=sleeping'.
+
+    Terms are separated by spaces and must all match. Operators are = != > >= < <=
+    plus ~ and !~ for case-insensitive regex search. Quote values containing spaces.
+    """
+    return ProcessFilter(expression, [_compile_term(term) for term in shlex.split(expression)])
+
+def build_filter(filter_by, filter_value):
+    """Return a predicate for a filter_by/filter_value pair, or None to keep everything."""
+    if not (filter_by and filter_value):
+        return None
+    if filter_by == "expr":
+        return compile_filter(filter_value)
+    value = filter_value.lower()
+    if filter_by == "status":
+        return lambda record: record.status == filter_value
+    if filter_by == "name":
+        return lambda record: value in record.name.lower()
+    if filter_by == "username":
+        return lambda record: value == record.username.lower()
+    return None
+
+def sort_processes(records, sort_by="pid"):
+    """Sort process records in place by one of the SORT_KEYS."""
+    if sort_by in SORT_KEYS:
+        key, reverse = SORT_KEYS[sort_by]
+        records.sort(key=key, reverse=reverse)
+    return records
+
+class ProcessSnapshot:
+    """Persistent process table that is refreshed incrementally.
+
+    Live psutil.Process handles are kept between refreshes, keyed by
+    (pid, create_time). New PIDs are queried fully, dead ones are dropped and
+    known ones only re-read the attributes that change (status, RSS, CPU%).
+    Because the same handle is sampled every time, cpu_percent reports usage
+    since the previous refresh instead of 0.0.
+    """
+    STATIC_ATTRS = ['pid', 'name', 'username', 'create_time']
+
+    def __init__(self):
+        self._entries = {}  # (pid, create_time) -> (psutil.Process, ProcessRecord or None)
+        self._keys = {}  # pid -> (pid, create_time)
+        self.added = []  # Records that appeared in the last refresh
+        self.removed = []  # Records that disappeared in the last refresh
+        self.listeners = []  # Callables run with the snapshot after every refresh
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _add(self, pid):
+        """Query a new PID fully and start tracking it."""
+        proc = psutil.Process(pid)
+        with proc.oneshot():
+            info = proc.as_dict(self.STATIC_ATTRS)
+            name = info['name']
+            username = info['username']
+            create_time = info['create_time']
+            key = (pid, create_time)
+            record = None
+            # Processes with missing critical fields are tracked but never shown,
+            # so they are not re-queried on every refresh
+            if name is not None and username is not None and create_time is not None:
+                status = proc.status()
+                rss = proc.memory_info().rss
+                proc.cpu_percent()  # Prime the CPU counter; the first sample is always 0.0
+                record = ProcessRecord(pid, name, username, status, rss, 0.0, create_time, proc.ppid())
+        self._entries[key] = (proc, record)
+        self._keys[pid] = key
+        if record is not None:
+            self.added.append(record)
+
+    def _update(self, proc, record):
+        """Re-read only the attributes that change between refreshes."""
+        with proc.oneshot():
+            record.status = proc.status()
+            record.rss = proc.memory_info().rss
+            record.cpu_percent = proc.cpu_percent()
+            record.ppid = proc.ppid()  # Changes when the process is re-parented
+
+    def _drop(self, pid):
+        key = self._keys.pop(pid)
+        _, record = self._entries.pop(key)
+        if record is not None:
+            self.removed.append(record)
+
+    def refresh(self):
+        """Bring the table up to date and return the live records."""
+        self.added = []
+        self.removed = []
+        current = set(psutil.pids())
+        for pid in [pid for pid in self._keys if pid not in current]:
+            self._drop(pid)
+        for pid in current:
+            try:
+                key = self._keys.get(pid)
+                if key is None:
+                    self._add(pid)
+                    continue
+                proc, record = self._entries[key]
+                if record is not None:
+                    self._update(proc, record)
+            except (psutil.NoSuchProcess, psutil.ZombieProcess):
+                # The process exited (or its PID was reused) while being read
+                if pid in self._keys:
+                    self._drop(pid)
+            except (psutil.AccessDenied, AttributeError):
                 continue
+        self._notify()
+        return self.records()
+
+    def _notify(self):
+        for listener in self.listeners:
+            listener(self)
+
+    def records(self):
+        """Return the records of all visible processes."""
+        return [record for _, record in self._entries.values() if record is not None]
+
+# Single-letter /proc/<pid>/stat states mapped to the names psutil reports
+PROC_STATUS_MAP = {
+    "R": "running",
+    "S": "sleeping",
+    "D": "disk-sleep",
+    "T": "stopped",
+    "t": "tracing-stop",
+    "Z": "zombie",
+    "X": "dead",
+    "x": "dead",
+    "K": "wake-kill",
+    "W": "waking",
+    "I": "idle",
+    "P": "parked",
+}
+
+def _read_proc_file(path, size=4096):
+    """Read a small /proc file with a single open/read/close."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        return os.read(fd, size)
+    finally:
+        os.close(fd)
+
+def parse_proc_stat(data):
+    """Parse /proc/<pid>/stat into (comm, state, ppid, cpu ticks, start ticks, rss pages)."""
+    head, _, tail = data.rpartition(b")")  # comm may itself contain ')'
+    comm = head.partition(b"(")[2].decode(errors="replace")
+    fields = tail.split()
+    return (
+        comm,
+        fields[0].decode(),
+        int(fields[1]),
+        int(fields[11]) + int(fields[12]),  # utime + stime
+        int(fields[19]),  # starttime
+        int(fields[21]),  # rss; same counter as the resident field of statm
+    )
+
+class ProcfsSnapshot(ProcessSnapshot):
+    """Linux snapshot backend that reads /proc directly.
+
+    Known processes cost a single read of /proc/<pid>/stat per refresh (it
+    carries state, CPU ticks, start time and RSS, so statm is not needed);
+    /proc/<pid>/status and cmdline are only read once, for new PIDs. Reads are
+    batched across a thread pool. Records match the psutil backend.
+    """
+    CHUNK_SIZE = 256
+
+    def __init__(self, max_workers=4, proc_root="/proc"):
+        super().__init__()
+        self.proc_root = proc_root
+        self.max_workers = max_workers
+        self._executor = None
+        self._boot_time = psutil.boot_time()
+        self._clock_ticks = os.sysconf("SC_CLK_TCK")
+        self._page_size = os.sysconf("SC_PAGE_SIZE")
+        self._usernames = {}
+        self._last_refresh = None
+
+    def _username(self, uid):
+        name = self._usernames.get(uid)
+        if name is None:
+            try:
+                name = pwd.getpwuid(uid).pw_name
+            except KeyError:
+                name = str(uid)
+            self._usernames[uid] = name
+        return name
 
-            # Apply filtering
-            if filter_by and filter_value:
-                if filter_by == "status" and status != filter_value:
+    def _collect(self, pid):
+        """Read one process; runs on a worker thread."""
+        base = f"{self.proc_root}/{pid}"
+        comm, state, ppid, ticks, start, rss_pages = parse_proc_stat(_read_proc_file(f"{base}/stat"))
+        create_time = round(self._boot_time + start / self._clock_ticks, 2)
+        key = (pid, create_time)
+        uid = name = None
+        if key not in self._entries:
+            for line in _read_proc_file(f"{base}/status").splitlines():
+                if line.startswith(b"Uid:"):
+                    uid = int(line.split()[1])  # Real UID, as psutil.Process.username() uses
+                    break
+            name = comm
+            if len(comm) >= 15:
+                # comm is truncated by the kernel; recover the full name like psutil does
+                cmdline = _read_proc_file(f"{base}/cmdline").split(b"\0")
+                if cmdline and cmdline[0]:
+                    extended = os.path.basename(cmdline[0].decode(errors="replace"))
+                    if extended.startswith(comm):
+                        name = extended
+        status = PROC_STATUS_MAP.get(state, state)
+        return pid, key, name, uid, status, ppid, ticks, rss_pages * self._page_size
+
+    def _collect_chunk(self, pids):
+        results = []
+        for pid in pids:
+            try:
+                results.append(self._collect(pid))
+            except (OSError, ValueError, IndexError):
+                continue  # Exited or unreadable while being scanned
+        return results
+
+    def refresh(self):
+        """Bring the table up to date from /proc and return the live records."""
+        self.added = []
+        self.removed = []
+        now = time.monotonic()
+        elapsed = now - self._last_refresh if self._last_refresh is not None else 0.0
+        self._last_refresh = now
+
+        pids = [int(entry) for entry in os.listdir(self.proc_root) if entry.isdigit()]
+        chunks = [pids[i:i + self.CHUNK_SIZE] for i in range(0, len(pids), self.CHUNK_SIZE)]
+        if self._executor is None and self.max_workers > 1:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        batches = self._executor.map(self._collect_chunk, chunks) if self._executor else map(self._collect_chunk, chunks)
+
+        seen = set()
+        for batch in batches:
+            for pid, key, name, uid, status, ppid, ticks, rss in batch:
+                seen.add(pid)
+                old_key = self._keys.get(pid)
+                if old_key is not None and old_key != key:
+                    self._drop(pid)  # PID was reused by a new process
+                entry = self._entries.get(key)
+                if entry is None:
+                    if uid is None:
+                        continue  # Became known mid-scan; picked up next refresh
+                    record = ProcessRecord(pid, name, self._username(uid), status, rss, 0.0, key[1], ppid)
+                    self._entries[key] = [ticks, record]
+                    self._keys[pid] = key
+                    self.added.append(record)
                     continue
-                elif filter_by == "name" and filter_value.lower() not in name.lower():
+                record = entry[1]
+                record.status = status
+                record.rss = rss
+                record.ppid = ppid
+                if elapsed > 0:
+                    record.cpu_percent = round((ticks - entry[0]) / self._clock_ticks / elapsed * 100, 1)
+                entry[0] = ticks
+        for pid in [pid for pid in self._keys if pid not in seen]:
+            self._drop(pid)
+        self._notify()
+        return self.records()
+
+def create_snapshot(backend="auto"):
+    """Create the fastest snapshot backend available on this platform.
+
+    backend is "auto", "procfs" (Linux only) or "psutil".
+    """
+    if backend == "procfs" or (backend == "auto" and sys.platform.startswith("linux") and os.path.isdir("/proc")):
+        return ProcfsSnapshot()
+    return ProcessSnapshot()
+
+class ProcessHistory:
+    """Fixed-size CPU%/RSS history for every tracked process.
+
+    Each process owns one slot (a row) in two capacity-wide ring buffers that
+    all advance together, one column per snapshot. Memory per process is
+    bounded by the capacity, and slots of exited processes are recycled.
+    NumPy arrays are used when available so window queries are vectorized;
+    otherwise flat array('d') buffers are scanned in Python.
+    """
+
+    def __init__(self, capacity=120, initial_slots=256):
+        self.capacity = capacity
+        self._slot_count = 0
+        self._slots = {}  # (pid, create_time) -> slot
+        self._records = {}  # slot -> ProcessRecord
+        self._free = []
+        self._samples = 0  # Total snapshots recorded
+        # Per-column timestamp and sample number, shared by all slots
+        self._times = array('d', [0.0]) * capacity
+        self._seq = array('q', [-1]) * capacity
+        self._since = array('q')  # Per-slot sample number of its first sample
+        if np is not None:
+            self._cpu = np.zeros((0, capacity))
+            self._rss = np.zeros((0, capacity))
+        else:
+            self._cpu = array('d')
+            self._rss = array('d')
+        self._grow(initial_slots)
+
+    def __len__(self):
+        return len(self._slots)
+
+    def _grow(self, extra):
+        """Add room for extra slots."""
+        self._free.extend(range(self._slot_count + extra - 1, self._slot_count - 1, -1))
+        self._slot_count += extra
+        self._since.extend([0] * extra)
+        if np is not None:
+            self._cpu = np.vstack([self._cpu, np.zeros((extra, self.capacity))])
+            self._rss = np.vstack([self._rss, np.zeros((extra, self.capacity))])
+        else:
+            self._cpu.extend([0.0] * (extra * self.capacity))
+            self._rss.extend([0.0] * (extra * self.capacity))
+
+    def _allocate(self, record):
+        if not self._free:
+            self._grow(max(self._slot_count, 64))
+        slot = self._free.pop()
+        self._slots[record.key] = slot
+        self._records[slot] = record
+        self._since[slot] = self._samples
+        return slot
+
+    def evict(self, record):
+        """Stop tracking a process and free its slot."""
+        slot = self._slots.pop(record.key, None)
+        if slot is not None:
+            del self._records[slot]
+            self._free.append(slot)
+
+    def record(self, snapshot, timestamp=None):
+        """Append one column of samples from a freshly refreshed snapshot."""
+        for record in snapshot.removed:
+            self.evict(record)
+        column = self._samples % self.capacity
+        self._times[column] = time.time() if timestamp is None else timestamp
+        self._seq[column] = self._samples
+        for record in snapshot.records():
+            slot = self._slots.get(record.key)
+            if slot is None:
+                slot = self._allocate(record)
+            if np is not None:
+                self._cpu[slot, column] = record.cpu_percent
+                self._rss[slot, column] = record.rss
+            else:
+                offset = slot * self.capacity + column
+                self._cpu[offset] = record.cpu_percent
+                self._rss[offset] = record.rss
+        self._samples += 1
+
+    def _window_columns(self, window):
+        """Return ring columns inside the time window, oldest first."""
+        if not self._samples:
+            return []
+        cutoff = self._times[(self._samples - 1) % self.capacity] - window
+        first = max(0, self._samples - self.capacity)
+        columns = [n % self.capacity for n in range(first, self._samples)]
+        return [column for column in columns if self._times[column] >= cutoff]
+
+    def _window_mask(self, columns):
+        """Boolean (slots x columns) mask of samples that belong to the slot's current process."""
+        seq = np.array([self._seq[column] for column in columns])
+        since = np.frombuffer(self._since, dtype=np.int64)
+        active = np.zeros(self._slot_count, dtype=bool)
+        active[list(self._records)] = True
+        return (seq[None, :] >= since[:, None]) & active[:, None]
+
+    def _slot_samples(self, slot, columns, buffer):
+        """Yield (timestamp, value) for one slot over the given columns (pure Python path)."""
+        since = self._since[slot]
+        base = slot * self.capacity
+        for column in columns:
+            if self._seq[column] >= since:
+                yield self._times[column], buffer[base + column]
+
+    def top_by_average_cpu(self, n=10, window=60):
+        """Return [(record, average CPU%)] of the n busiest processes over the last window seconds."""
+        columns = self._window_columns(window)
+        if not columns or not self._records:
+            return []
+        if np is not None:
+            mask = self._window_mask(columns)
+            counts = mask.sum(axis=1)
+            totals = (self._cpu[:, columns] * mask).sum(axis=1)
+            averages = np.divide(totals, counts, out=np.zeros_like(totals), where=counts > 0)
+            slots = [slot for slot in np.argsort(-averages) if counts[slot]][:n]
+            return [(self._records[slot], float(averages[slot])) for slot in slots]
+        results = []
+        for slot, record in self._records.items():
+            values = [value for _, value in self._slot_samples(slot, columns, self._cpu)]
+            if values:
+                results.append((record, sum(values) / len(values)))
+        results.sort(key=lambda item: item[1], reverse=True)
+        return results[:n]
+
+    def fastest_growing_rss(self, n=10, window=60):
+        """Return [(record, bytes per second)] of the n processes whose RSS grew fastest."""
+        columns = self._window_columns(window)
+        if len(columns) < 2 or not self._records:
+            return []
+        if np is not None:
+            mask = self._window_mask(columns)
+            rss = self._rss[:, columns]
+            times = np.array([self._times[column] for column in columns])
+            rows = np.flatnonzero(mask.sum(axis=1) >= 2)
+            first = mask[rows].argmax(axis=1)
+            last = len(columns) - 1 - mask[rows, ::-1].argmax(axis=1)
+            elapsed = times[last] - times[first]
+            growth = np.divide(rss[rows, last] - rss[rows, first], elapsed,
+                               out=np.zeros(len(rows)), where=elapsed > 0)
+            order = np.argsort(-growth)[:n]
+            return [(self._records[int(rows[i])], float(growth[i])) for i in order]
+        results = []
+        for slot, record in self._records.items():
+            samples = list(self._slot_samples(slot, columns, self._rss))
+            if len(samples) >= 2 and samples[-1][0] > samples[0][0]:
+                growth = (samples[-1][1] - samples[0][1]) / (samples[-1][0] - samples[0][0])
+                results.append((record, growth))
+        results.sort(key=lambda item: item[1], reverse=True)
+        return results[:n]
+
+class ProcessTree:
+    """Parent/child index over a snapshot with rolled-up subtree RSS and CPU%.
+
+    The ppid -> children index is maintained incrementally from each
+    refresh's added/removed records and re-parented PIDs. Subtree totals are
+    adjusted by deltas along the ancestor path of each node that changed,
+    instead of being re-summed over the whole tree.
+    """
+
+    def __init__(self):
+        self.nodes = {}  # pid -> ProcessRecord
+        self.parent = {}  # pid -> ppid
+        self.children = {}  # ppid -> set of child pids
+        self.subtree_rss = {}
+        self.subtree_cpu = {}
+        self.collapsed = set()
+        self._own = {}  # pid -> (rss, cpu) already included in the rollups
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def _propagate(self, pid, rss, cpu):
+        """Add an RSS/CPU delta to pid and every ancestor of it."""
+        steps = len(self.nodes)  # Guards against a transient parent cycle
+        while pid in self.nodes and steps:
+            self.subtree_rss[pid] += rss
+            self.subtree_cpu[pid] += cpu
+            if self.parent[pid] == pid:
+                break  # Its own parent (pid 0 on macOS and Windows): a root
+            pid = self.parent[pid]
+            steps -= 1
+
+    def _insert(self, record):
+        pid = record.pid
+        self.nodes[pid] = record
+        self.parent[pid] = record.ppid
+        self.children.setdefault(record.ppid, set()).add(pid)
+        self._own[pid] = (record.rss, record.cpu_percent)
+        # Children may already be known (orphans, or seen before the parent)
+        self.subtree_rss[pid] = 0
+        self.subtree_cpu[pid] = 0.0
+        children = [child for child in self.children.get(pid, ()) if child in self.nodes and child != pid]
+        rss = record.rss + sum(self.subtree_rss[child] for child in children)
+        cpu = record.cpu_percent + sum(self.subtree_cpu[child] for child in children)
+        self._propagate(pid, rss, cpu)
+
+    def _remove(self, pid):
+        if pid not in self.nodes:
+            return
+        if self.parent[pid] != pid:
+            self._propagate(self.parent[pid], -self.subtree_rss[pid], -self.subtree_cpu[pid])
+        self.children.get(self.parent[pid], set()).discard(pid)
+        # Children stay in the index as roots until the kernel re-parents them
+        for table in (self.nodes, self.parent, self._own, self.subtree_rss, self.subtree_cpu):
+            del table[pid]
+        self.collapsed.discard(pid)
+
+    def _move(self, pid, ppid):
+        rss, cpu = self.subtree_rss[pid], self.subtree_cpu[pid]
+        old = self.parent[pid]
+        # A process that is its own parent is a root: its totals only ever count for itself
+        if old != pid:
+            self._propagate(old, -rss, -cpu)
+        self.children.get(old, set()).discard(pid)
+        self.parent[pid] = ppid
+        self.children.setdefault(ppid, set()).add(pid)
+        if ppid != pid:
+            self._propagate(ppid, rss, cpu)
+
+    def update(self, snapshot):
+        """Apply a refreshed snapshot; usable as a snapshot listener."""
+        for record in snapshot.removed:
+            if self.nodes.get(record.pid) is record:
+                self._remove(record.pid)
+        for record in snapshot.records():
+            pid = record.pid
+            current = self.nodes.get(pid)
+            if current is not record:
+                if current is not None:
+                    self._remove(pid)  # Same PID, different process
+                self._insert(record)
+                continue
+            if self.parent[pid] != record.ppid:
+                self._move(pid, record.ppid)
+            rss, cpu = self._own[pid]
+            if rss != record.rss or cpu != record.cpu_percent:
+                self._own[pid] = (record.rss, record.cpu_percent)
+                self._propagate(pid, record.rss - rss, record.cpu_percent - cpu)
+
+    def roots(self):
+        """Return PIDs whose parent is not in the tree."""
+        return [pid for pid, ppid in self.parent.items() if ppid not in self.nodes or ppid == pid]
+
+    def _sorted_children(self, pid):
+        children = [child for child in self.children.get(pid, ()) if child in self.nodes and child != pid]
+        children.sort(key=self.subtree_rss.__getitem__, reverse=True)
+        return children
+
+    def rows(self):
+        """Return visible (depth, record) rows in depth-first order, largest subtrees first."""
+        rows = []
+        stack = [(0, pid) for pid in sorted(self.roots(), key=self.subtree_rss.__getitem__)]
+        while stack:
+            depth, pid = stack.pop()
+            rows.append((depth, self.nodes[pid]))
+            if pid not in self.collapsed:
+                stack.extend((depth + 1, child) for child in reversed(self._sorted_children(pid)))
+        return rows
+
+    def has_children(self, pid):
+        return any(child in self.nodes and child != pid for child in self.children.get(pid, ()))
+
+    def subtree_pids(self, pid):
+        """Return pid and all of its descendants, parents before children."""
+        pids = []
+        seen = set()
+        stack = [pid]
+        while stack:
+            current = stack.pop()
+            if current in self.nodes and current not in seen:
+                seen.add(current)
+                pids.append(current)
+                stack.extend(self.children.get(current, ()))
+        return pids
+
+    def toggle(self, pid):
+        """Collapse or expand the subtree under pid."""
+        if pid in self.collapsed:
+            self.collapsed.discard(pid)
+        elif self.has_children(pid):
+            self.collapsed.add(pid)
+
+def format_tree_entry(tree, depth, record):
+    """Format a tree row with the subtree rollups."""
+    if not tree.has_children(record.pid):
+        marker = "   "
+    else:
+        marker = "[+]" if record.pid in tree.collapsed else "[-]"
+    label = f"{'  ' * depth}{marker} {record.name}"
+    return (
+        f"{record.pid:<8} | "
+        f"{label:<40.40} | "
+        f"{record.memory_mb:>8.2f} MB | "
+        f"{tree.subtree_rss[record.pid] / (1024 * 1024):>9.2f} MB | "
+        f"{tree.subtree_cpu[record.pid]:>6.1f}%"
+    )
+
+def read_cgroup(pid, proc_root="/proc"):
+    """Return the cgroup path of a process (the unified v2 entry when present)."""
+    try:
+        with open(f"{proc_root}/{pid}/cgroup") as file:
+            lines = file.read().splitlines()
+    except OSError:
+        return "?"
+    for line in lines:
+        if line.startswith("0::"):
+            return line[3:] or "/"
+    return lines[0].split(":", 2)[2] if lines else "?"
+
+class GroupStats:
+    """Aggregate count, RSS and CPU% of the processes in one group."""
+    __slots__ = ("name", "count", "rss", "cpu_percent", "members")
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.rss = 0
+        self.cpu_percent = 0.0
+        self.members = {}  # (pid, create_time) -> ProcessRecord
+
+# Functions deriving the group of a record for each group_by mode
+GROUP_KEYS = {
+    "name": attrgetter("name"),
+    "user": attrgetter("username"),
+    "cgroup": lambda record: read_cgroup(record.pid),
+}
+
+class ProcessGroups:
+    """Per-group aggregates kept up to date from snapshot refreshes.
+
+    Each process is assigned to a group once, when it first appears (so a
+    cgroup file is read once per process). After that only RSS/CPU deltas
+    of changed processes are applied to their group's totals.
+    """
+
+    def __init__(self, group_by="name"):
+        if group_by not in GROUP_KEYS:
+            raise ValueError(f"Unknown grouping: {group_by!r}")
+        self.group_by = group_by
+        self.groups = {}  # group name -> GroupStats
+        self._membership = {}  # (pid, create_time) -> [GroupStats, rss, cpu]
+
+    def __len__(self):
+        return len(self.groups)
+
+    def _remove(self, key):
+        stats, rss, cpu = self._membership.pop(key)
+        stats.count -= 1
+        stats.rss -= rss
+        stats.cpu_percent -= cpu
+        del stats.members[key]
+        if not stats.count:
+            del self.groups[stats.name]
+
+    def update(self, snapshot):
+        """Apply a refreshed snapshot; usable as a snapshot listener."""
+        for record in snapshot.removed:
+            if record.key in self._membership:
+                self._remove(record.key)
+        group_of = GROUP_KEYS[self.group_by]
+        for record in snapshot.records():
+            entry = self._membership.get(record.key)
+            if entry is None:
+                name = group_of(record)
+                stats = self.groups.get(name)
+                if stats is None:
+                    stats = self.groups[name] = GroupStats(name)
+                stats.count += 1
+                stats.rss += record.rss
+                stats.cpu_percent += record.cpu_percent
+                stats.members[record.key] = record
+                self._membership[record.key] = [stats, record.rss, record.cpu_percent]
+                continue
+            stats, rss, cpu = entry
+            if rss != record.rss or cpu != record.cpu_percent:
+                stats.rss += record.rss - rss
+                stats.cpu_percent += record.cpu_percent - cpu
+                entry[1] = record.rss
+                entry[2] = record.cpu_percent
+
+    def rows(self, sort_by="memory"):
+        """Return GroupStats sorted by "memory", "cpu", "count" or "name"."""
+        keys = {
+            "memory": (attrgetter("rss"), True),
+            "cpu": (attrgetter("cpu_percent"), True),
+            "count": (attrgetter("count"), True),
+            "name": (lambda stats: str(stats.name).lower(), False),
+        }
+        key, reverse = keys.get(sort_by, keys["memory"])
+        return sorted(self.groups.values(), key=key, reverse=reverse)
+
+    def members(self, name):
+        """Return the records of one group."""
+        stats = self.groups.get(name)
+        return list(stats.members.values()) if stats else []
+
+def format_group_entry(stats):
+    """Format a group aggregate row."""
+    return (
+        f"{str(stats.name):<40.40} | "
+        f"{stats.count:>6} procs | "
+        f"{stats.rss / (1024 * 1024):>10.2f} MB | "
+        f"{max(stats.cpu_percent, 0.0):>6.1f}%"
+    )
+
+class SocketEntry:
+    """One socket from /proc/net and the process that owns it, if known."""
+    __slots__ = ("proto", "local_address", "local_port", "remote_address", "remote_port", "state", "inode", "owner")
+
+    def __init__(self, proto, local_address, local_port, remote_address, remote_port, state, inode):
+        self.proto = proto
+        self.local_address = local_address
+        self.local_port = local_port
+        self.remote_address = remote_address
+        self.remote_port = remote_port
+        self.state = state
+        self.inode = inode
+        self.owner = None  # ProcessRecord
+
+def read_socket_table(proc_root="/proc"):
+    """Parse /proc/net/{tcp,udp}{,6} into {inode: SocketEntry}."""
+    sockets = {}
+    for proto, family in SOCKET_TABLES:
+        for line in read_table(f"{proc_root}/net/{proto}"):
+            fields = line.split()
+            if len(fields) < 10:
+                continue
+            local_address, local_port = decode_proc_address(fields[1], family)
+            remote_address, remote_port = decode_proc_address(fields[2], family)
+            state = TCP_STATES.get(fields[3], fields[3]) if proto.startswith("tcp") else "NONE"
+            inode = int(fields[9])
+            entry = SocketEntry(proto, local_address, local_port, remote_address, remote_port, state, inode)
+            if inode:
+                sockets[inode] = entry
+            else:
+                sockets[-len(sockets) - 1] = entry  # TIME_WAIT and friends have no inode or owner
+    return sockets
+
+def read_socket_inodes(pid, proc_root="/proc"):
+    """Return the inodes of all sockets a process has open."""
+    inodes = set()
+    base = f"{proc_root}/{pid}/fd"
+    try:
+        fds = os.listdir(base)
+    except OSError:
+        return inodes
+    for fd in fds:
+        try:
+            target = os.readlink(f"{base}/{fd}")
+        except OSError:
+            continue
+        if target.startswith("socket:["):
+            inodes.add(int(target[8:-1]))
+    return inodes
+
+class SocketMap:
+    """Joins /proc/net socket tables with the processes that own the sockets.
+
+    The tables are parsed once per refresh. File descriptors are only
+    scanned for processes that are new or used CPU since the last refresh
+    (a process has to run to open a socket); the inodes found are cached
+    per (pid, create_time). Every full_scan_every refreshes, processes are
+    rescanned while sockets remain unowned, to catch anything the heuristic
+    missed.
+    """
+
+    def __init__(self, proc_root="/proc", full_scan_every=10):
+        self.proc_root = proc_root
+        self.full_scan_every = full_scan_every
+        self._inodes = {}  # (pid, create_time) -> set of socket inodes
+        self._owners = {}  # inode -> ProcessRecord
+        self._refreshes = 0
+        self.scanned = 0  # Processes whose fds were read in the last refresh
+
+    def refresh(self, snapshot):
+        """Re-read the socket tables and return a list of SocketEntry with owners set."""
+        sockets = read_socket_table(self.proc_root)
+        records = snapshot.records()
+        live = {record.key for record in records}
+        for key in [key for key in self._inodes if key not in live]:
+            del self._inodes[key]
+        unowned = any(inode > 0 and inode not in self._owners for inode in sockets)
+        full_scan = unowned and self._refreshes % self.full_scan_every == 0
+        self.scanned = 0
+        for record in records:
+            if full_scan or record.key not in self._inodes or record.cpu_percent > 0:
+                self._inodes[record.key] = read_socket_inodes(record.pid, self.proc_root)
+                self.scanned += 1
+        self._owners = {}
+        records_by_key = {record.key: record for record in records}
+        for key, inodes in self._inodes.items():
+            for inode in inodes:
+                self._owners[inode] = records_by_key[key]
+        for inode, entry in sockets.items():
+            entry.owner = self._owners.get(inode)
+        self._refreshes += 1
+        return list(sockets.values())
+
+def format_socket_entry(entry):
+    """Format a socket row with its owning process."""
+    local = f"{entry.local_address}:{entry.local_port}"
+    remote = f"{entry.remote_address}:{entry.remote_port}"
+    owner = entry.owner
+    return (
+        f"{entry.proto:<5} | "
+        f"{local:<28.28} | "
+        f"{remote:<28.28} | "
+        f"{entry.state:<12} | "
+        f"{owner.pid if owner else '-':<8} | "
+        f"{owner.name if owner else '-'}"
+    )
+
+watch_logger = logging.getLogger("taskmaneger.watch")
+
+RULE_PATTERN = re.compile(
+    r"(?P<total>total\s+)?(?P<metric>rss|cpu|count)"
+    r"(?:\s+of\s+(?P<filter>.+?))?"
+    r"\s+(?P<op>>=|<=|>|<)\s+(?P<value>\S+)"
+    r"(?:\s+for\s+(?P<duration>[0-9.]+)s?)?"
+    r"(?:\s+clear\s+(?P<clear>\S+))?",
+    re.IGNORECASE,
+)
+HYSTERESIS = 0.1  # Default clear band: 10% on the safe side of the threshold
+
+class WatchRule:
+    """A compiled threshold rule such as 'rss of name=java > 4G for 30s => log'.
+
+    Per-process rules (rss, cpu) track each matching process separately;
+    'total rss', 'total cpu' and 'count' aggregate over all matching
+    processes. Per-process cpu is psutil's per-core percentage (up to
+    N x 100); 'total cpu' is the matching processes' share of the whole
+    machine, i.e. their summed cpu divided by the number of CPUs, 0-100.
+    A process that stops matching the rule's filter, or exits, clears it.
+    A rule fires once the condition has held for the duration and
+    clears once the value has been back past the clear threshold for the
+    same duration, so it does not flap around the threshold.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        condition, _, action = text.partition("=>")
+        match = RULE_PATTERN.fullmatch(condition.strip())
+        if not match:
+            raise ValueError(f"Invalid watch rule: {text!r}")
+        self.metric = match.group("metric").lower()
+        self.total = bool(match.group("total")) or self.metric == "count"
+        self.filter_text = match.group("filter") or ""
+        self.filter = compile_filter(self.filter_text) if self.filter_text else None
+        parse = parse_size if self.metric == "rss" else lambda value: float(value.rstrip("%"))
+        self.above = match.group("op").startswith(">")
+        self.compare = FILTER_OPERATORS[match.group("op")]
+        try:
+            self.threshold = parse(match.group("value"))
+            default_clear = self.threshold * (1 - HYSTERESIS if self.above else 1 + HYSTERESIS)
+            self.clear = parse(match.group("clear")) if match.group("clear") else default_clear
+        except ValueError:
+            raise ValueError(f"Invalid threshold in watch rule: {text!r}")
+        self.duration = float(match.group("duration") or 0)
+        self.action = action.strip() or "log"
+        if not re.match(r"(log|run\s+\S.*|webhook\s+\S+)$", self.action):
+            raise ValueError(f"Invalid action in watch rule: {text!r}")
+        # Equality terms on name/user let the engine index the rule instead of scanning for it
+        self.index_field = self.index_value = None
+        for term in shlex.split(self.filter_text):
+            field, _, value = term.partition("=")
+            if field.lower() in ("name", "user", "username") and value:
+                self.index_field = "name" if field.lower() == "name" else "user"
+                self.index_value = value.lower()
+                break
+
+    def value(self, record):
+        return record.rss if self.metric == "rss" else record.cpu_percent
+
+    def is_clear(self, value):
+        return value < self.clear if self.above else value > self.clear
+
+class RuleState:
+    """Hysteresis state of one rule for one subject."""
+    __slots__ = ("subject", "since", "firing", "clear_since")
+
+    def __init__(self, subject):
+        self.subject = subject
+        self.since = None
+        self.firing = False
+        self.clear_since = None
+
+class WatchEngine:
+    """Evaluates watch rules against every snapshot in a single pass.
+
+    Rules with a name= or user= term are indexed by that value, so each
+    process only meets the rules that can match it plus the unindexed ones.
+    """
+
+    def __init__(self, rules):
+        self.rules = list(rules)
+        self.by_name = {}
+        self.by_user = {}
+        self.unindexed = []
+        for rule in self.rules:
+            if rule.index_field == "name":
+                self.by_name.setdefault(rule.index_value, []).append(rule)
+            elif rule.index_field == "user":
+                self.by_user.setdefault(rule.index_value, []).append(rule)
+            else:
+                self.unindexed.append(rule)
+        self.states = {}  # (rule, process key or None for totals) -> RuleState
+        self.cpu_count = psutil.cpu_count() or 1
+        self.events = deque(maxlen=200)  # Recent (timestamp, event, rule text, subject, value)
+
+    def evaluate(self, snapshot, now=None):
+        """Check every rule against the snapshot; usable as a snapshot listener."""
+        now = time.monotonic() if now is None else now
+        totals = {}
+        matched = set()  # (rule, key) of per-process rules that matched this pass
+        for record in snapshot.records():
+            candidates = (self.by_name.get(record.name.lower(), []) + self.by_user.get(record.username.lower(), [])
+                          + self.unindexed)
+            for rule in candidates:
+                if rule.filter is not None and not rule.filter(record):
                     continue
-                elif filter_by == "username" and filter_value.lower() != username.lower():
+                if rule.total:
+                    if rule.metric == "count":
+                        totals[rule] = totals.get(rule, 0) + 1
+                    else:
+                        totals[rule] = totals.get(rule, 0) + rule.value(record)
+                else:
+                    matched.add((rule, record.key))
+                    self._check(rule, record.key, f"{record.name} ({record.pid})", rule.value(record), now)
+        for rule in self.rules:
+            if rule.total:
+                total = totals.get(rule, 0)
+                if rule.metric == "cpu":
+                    total /= self.cpu_count
+                self._check(rule, None, "total", total, now)
+        # Processes that exited or no longer match the filter no longer hold the condition
+        for (rule, key), state in list(self.states.items()):
+            if key is not None and (rule, key) not in matched:
+                del self.states[(rule, key)]
+                if state.firing:
+                    self._fire(rule, "cleared", state.subject, None)
+
+    def _check(self, rule, key, subject, value, now):
+        state = self.states.get((rule, key))
+        if state is None:
+            if not rule.compare(value, rule.threshold):
+                return  # Only conditions that have started holding need state
+            state = self.states[(rule, key)] = RuleState(subject)
+        if not state.firing:
+            if rule.compare(value, rule.threshold):
+                state.since = state.since if state.since is not None else now
+                if now - state.since >= rule.duration:
+                    state.firing = True
+                    state.clear_since = None
+                    self._fire(rule, "fired", subject, value)
+            else:
+                del self.states[(rule, key)]
+        elif rule.is_clear(value):
+            state.clear_since = state.clear_since if state.clear_since is not None else now
+            if now - state.clear_since >= rule.duration:
+                del self.states[(rule, key)]
+                self._fire(rule, "cleared", subject, value)
+        else:
+            state.clear_since = None
+
+    def _fire(self, rule, event, subject, value):
+        if value is None:
+            shown = "no longer matching"
+        else:
+            shown = f"{value / (1024 * 1024):.1f} MB" if rule.metric == "rss" else f"{value:g}"
+        self.events.append((time.time(), event, rule.text, subject, shown))
+        watch_logger.warning("Rule %s: %s | %s = %s", event, rule.text, subject, shown)
+        if event != "fired" or rule.action == "log":
+            return
+        verb, _, target = rule.action.partition(" ")
+        if verb == "run":
+            env = dict(os.environ, WATCH_RULE=rule.text, WATCH_SUBJECT=subject, WATCH_VALUE=shown)
+            try:
+                subprocess.Popen(shlex.split(target), env=env)
+            except OSError as e:
+                watch_logger.error("Rule action failed: %s", e)
+        else:
+            body = json.dumps({"rule": rule.text, "subject": subject, "value": shown, "timestamp": time.time()})
+            threading.Thread(target=_post_webhook, args=(target, body.encode()), daemon=True).start()
+
+def _post_webhook(url, body):
+    """POST a rule event without blocking the sampler."""
+    request = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+    try:
+        urllib.request.urlopen(request, timeout=5).close()
+    except OSError as e:
+        watch_logger.error("Webhook %s failed: %s", url, e)
+
+def load_watch_rules(path):
+    """Read one rule per line ('#' starts a comment) and return a WatchEngine."""
+    rules = []
+    with open(path) as file:
+        for line in file:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                rules.append(WatchRule(line))
+    if not watch_logger.handlers:
+        handler = logging.FileHandler("process_watch.log")
+        handler.setFormatter(logging.Formatter("%(asctime)s - %(message)s"))
+        watch_logger.addHandler(handler)
+    return WatchEngine(rules)
+
+RECORDING_MAGIC = b"TMREC2\n"
+LEGACY_RECORDING_MAGIC = b"TMREC1\n"  # Records without ppid
+FRAME_HEADER = struct.Struct("<cdI")  # Frame type, timestamp, payload length
+KEYFRAME = b"K"
+DELTA_FRAME = b"D"
+# Bits of the change mask in delta frames
+CHANGED_STATUS, CHANGED_RSS, CHANGED_CPU, CHANGED_PPID = 1, 2, 4, 8
+
+def _encode_record(record):
+    """Pack a record into the tuple stored in recordings (RSS in KB, CPU in tenths)."""
+    return (record.create_time, record.name, record.username, record.status,
+            record.rss // 1024, int(round(record.cpu_percent * 10)), record.ppid)
+
+def _decode_record(pid, fields):
+    create_time, name, username, status, rss_kb, cpu_tenths = fields[:6]
+    ppid = fields[6] if len(fields) > 6 else 0  # TMREC1 recordings did not store it
+    return ProcessRecord(pid, name, username, status, rss_kb * 1024, cpu_tenths / 10, create_time, ppid)
+
+class SnapshotRecorder:
+    """Append-only, delta-encoded recorder of process snapshots.
+
+    A recording is the TMREC2 magic header followed by frames, each a small
+    fixed header and a zlib-compressed JSON payload. Keyframes hold every
+    process; delta frames between them only hold added PIDs, removed PIDs and
+    the fields (status, RSS, CPU%, PPID) that changed. Every session starts
+    with a keyframe, so files can be appended to across runs; legacy TMREC1
+    files (no PPID) can be replayed but not appended to.
+    """
+
+    def __init__(self, path, keyframe_interval=300):
+        self.path = path
+        self.keyframe_interval = keyframe_interval
+        self._file = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(RECORDING_MAGIC)
+        else:
+            with open(path, "rb") as file:
+                if file.read(len(RECORDING_MAGIC)) != RECORDING_MAGIC:
+                    self._file.close()
+                    raise ValueError(f"{path} is not a current-format process recording; record to a new file")
+        self._previous = {}  # pid -> encoded fields from the last frame
+        self._since_keyframe = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._file.close()
+
+    def record(self, snapshot, timestamp=None):
+        """Append a frame for the snapshot's current records."""
+        timestamp = time.time() if timestamp is None else timestamp
+        state = {record.pid: _encode_record(record) for record in snapshot.records()}
+        if self._since_keyframe is None or self._since_keyframe >= self.keyframe_interval:
+            frame_type = KEYFRAME
+            payload = [[pid, *fields] for pid, fields in state.items()]
+            self._since_keyframe = 0
+        else:
+            frame_type = DELTA_FRAME
+            added, changed = [], []
+            previous = self._previous
+            for pid, fields in state.items():
+                old = previous.get(pid)
+                if old is None or old[0] != fields[0]:
+                    added.append([pid, *fields])  # New process or reused PID
                     continue
+                mask = 0
+                values = []
+                if old[3] != fields[3]:
+                    mask |= CHANGED_STATUS
+                    values.append(fields[3])
+                if old[4] != fields[4]:
+                    mask |= CHANGED_RSS
+                    values.append(fields[4])
+                if old[5] != fields[5]:
+                    mask |= CHANGED_CPU
+                    values.append(fields[5])
+                if old[6] != fields[6]:
+                    mask |= CHANGED_PPID  # Re-parented, e.g. orphans adopted by init
+                    values.append(fields[6])
+                if mask:
+                    changed.append([pid, mask, *values])
+            removed = [pid for pid in previous if pid not in state]
+            payload = {"a": added, "r": removed, "c": changed}
+        data = zlib.compress(json.dumps(payload, separators=(",", ":")).encode())
+        self._file.write(FRAME_HEADER.pack(frame_type, timestamp, len(data)) + data)
+        self._file.flush()
+        self._previous = state
+        self._since_keyframe += 1
 
-            # Format the process entry with proper spacing
-            process_entry = (
-                f"{pid:<8} | "  # PID (left-aligned, 8 characters)
-                f"{name:<20} | "  # Name (left-aligned, 20 characters)
-                f"{username:<15} | "  # Username (left-aligned, 15 characters)
-                f"{status:<10} | "  # Status (left-aligned, 10 characters)
-                f"{memory_usage:>8.2f} MB | "  # Memory usage (right-aligned, 8 characters)
-                f"{cpu_usage:>6.1f}% | "  # CPU usage (right-aligned, 6 characters)
-                f"{create_time}"  # Creation time
-            )
-            processes.append((pid, process_entry))
-        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess, KeyError):
-            # Skip processes that are no longer running, inaccessible, or missing fields
-            continue
+class SnapshotPlayer:
+    """Random-access reader for recordings written by SnapshotRecorder.
+
+    Opening a recording scans only the frame headers to build a timestamp
+    index; seeking decodes from the nearest keyframe at or before the target.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        magic = self._file.read(len(RECORDING_MAGIC))
+        if magic not in (RECORDING_MAGIC, LEGACY_RECORDING_MAGIC):
+            self._file.close()
+            raise ValueError(f"{path} is not a process recording")
+        self.has_ppid = magic == RECORDING_MAGIC
+        self.times = []
+        self._offsets = []
+        self._keyframes = []  # Frame indexes of keyframes
+        size = os.fstat(self._file.fileno()).st_size
+        while True:
+            offset = self._file.tell()
+            header = self._file.read(FRAME_HEADER.size)
+            if len(header) < FRAME_HEADER.size:
+                break
+            frame_type, timestamp, length = FRAME_HEADER.unpack(header)
+            if offset + FRAME_HEADER.size + length > size:
+                break  # Truncated final frame from an interrupted recorder
+            self._file.seek(length, os.SEEK_CUR)
+            if frame_type == KEYFRAME:
+                self._keyframes.append(len(self.times))
+            self.times.append(timestamp)
+            self._offsets.append(offset)
+
+    def __len__(self):
+        return len(self.times)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
-    # Apply sorting
-    if sort_by == "pid":
-        processes.sort(key=lambda x: int(x[0]))
-    elif sort_by == "name":
-        processes.sort(key=lambda x: x[1].split('|')[1].strip().lower())
-    elif sort_by == "memory":
-        processes.sort(key=lambda x: float(x[1].split('|')[4].strip().split()[0]), reverse=True)
-    elif sort_by == "cpu":
-        processes.sort(key=lambda x: float(x[1].split('|')[5].strip().split('%')[0]), reverse=True)
+    def close(self):
+        self._file.close()
 
-    return [x[1] for x in processes]
+    def _read_frame(self, index):
+        self._file.seek(self._offsets[index])
+        frame_type, _, length = FRAME_HEADER.unpack(self._file.read(FRAME_HEADER.size))
+        return frame_type, json.loads(zlib.decompress(self._file.read(length)))
+
+    def _apply(self, state, index):
+        """Apply frame index to a pid -> fields state in place."""
+        frame_type, payload = self._read_frame(index)
+        if frame_type == KEYFRAME:
+            state.clear()
+            for pid, *fields in payload:
+                state[pid] = fields
+            return
+        for pid in payload["r"]:
+            state.pop(pid, None)
+        for pid, *fields in payload["a"]:
+            state[pid] = fields
+        for pid, mask, *values in payload["c"]:
+            fields = state[pid]
+            position = 0
+            for bit, column in ((CHANGED_STATUS, 3), (CHANGED_RSS, 4), (CHANGED_CPU, 5), (CHANGED_PPID, 6)):
+                if mask & bit:
+                    fields[column] = values[position]
+                    position += 1
+
+    def index_at(self, timestamp):
+        """Return the index of the last frame at or before timestamp (0 if before the start)."""
+        return max(bisect.bisect_right(self.times, timestamp) - 1, 0)
+
+    def frames(self, start=None, end=None):
+        """Yield (timestamp, records) for every frame between start and end timestamps."""
+        if not self.times:
+            return
+        first = self.index_at(start) if start is not None else 0
+        keyframe = self._keyframes[max(bisect.bisect_right(self._keyframes, first) - 1, 0)]
+        state = {}
+        for index in range(keyframe, len(self.times)):
+            if end is not None and self.times[index] > end:
+                break
+            self._apply(state, index)
+            if index >= first:
+                yield self.times[index], [_decode_record(pid, fields) for pid, fields in state.items()]
+
+    def seek(self, timestamp):
+        """Return (timestamp, records) of the frame in effect at timestamp."""
+        for frame in self.frames(timestamp):
+            return frame
+        return None
+
+def get_process_list(sort_by="pid", filter_by=None, filter_value=None, snapshot=None):
+    """Collect a list of running processes with optional sorting and filtering.
+
+    Pass a persistent ProcessSnapshot to refresh incrementally between calls.
+    filter_by is "status", "name", "username" or "expr" for a filter expression
+    (see compile_filter).
+    """
+    if snapshot is None:
+        snapshot = create_snapshot()
+    records = snapshot.refresh()
+    predicate = build_filter(filter_by, filter_value)
+    processes = records if predicate is None else [record for record in records if predicate(record)]
+    return sort_processes(processes, sort_by)
 
 def kill_process(pid):
     """Kill a process by its PID with colorful feedback."""
@@ -87,21 +1578,56 @@ def kill_process(pid):
     except psutil.AccessDenied:
         print(f"{RED}Access denied to terminate process {pid}.{RESET}")
 
+def get_system_metrics():
+    """Collect the system-wide metrics shown in the header."""
+    memory_info = psutil.virtual_memory()
+    return {
+        "memory_total": memory_info.total,
+        "memory_used": memory_info.used,
+        "cpu_percent": psutil.cpu_percent(),
+        "disk_percent": psutil.disk_usage('/').percent,
+    }
+
+def build_header_lines(refresh_interval, sort_by, filter_by, filter_value, hint="Press 'q' to open options menu"):
+    """Build the colorful header lines with dynamic information."""
+    metrics = get_system_metrics()
+    cpu_usage = metrics["cpu_percent"]
+    disk_usage = metrics["disk_percent"]
+    total_memory = metrics["memory_total"] / (1024 * 1024)  # Convert to MB
+    used_memory = metrics["memory_used"] / (1024 * 1024)  # Convert to MB
+
+    return [
+        f"{BOLD}{BLUE}=== Process Manager ==={RESET}",
+        f"{CYAN}Refresh Interval: {refresh_interval} seconds | Sort By: {sort_by} | Filter: {filter_by}={filter_value}{RESET}",
+        f"{YELLOW}Memory Usage: {used_memory:.2f} MB / {total_memory:.2f} MB | CPU Usage: {cpu_usage:.1f}% | Disk Usage: {disk_usage:.1f}%{RESET}",
+        f"{MAGENTA}{hint}{RESET}",
+        f"{MAGENTA}----------------------------------------{RESET}",
+    ]
+
 def display_header(refresh_interval, sort_by, filter_by, filter_value):
     """Display a colorful header with dynamic information."""
     clear_screen()  # Clear the screen for dynamic updates
-    # Display system metrics
-    memory_info = psutil.virtual_memory()
-    cpu_usage = psutil.cpu_percent()
-    disk_usage = psutil.disk_usage('/').percent
-    total_memory = memory_info.total / (1024 * 1024)  # Convert to MB
-    used_memory = memory_info.used / (1024 * 1024)  # Convert to MB
+    print("\n".join(build_header_lines(refresh_interval, sort_by, filter_by, filter_value)))
 
-    print(f"{BOLD}{BLUE}=== Process Manager ==={RESET}")
-    print(f"{CYAN}Refresh Interval: {refresh_interval} seconds | Sort By: {sort_by} | Filter: {filter_by}={filter_value}{RESET}")
-    print(f"{YELLOW}Memory Usage: {used_memory:.2f} MB / {total_memory:.2f} MB | CPU Usage: {cpu_usage:.1f}% | Disk Usage: {disk_usage:.1f}%{RESET}")
-    print(f"{MAGENTA}Press 'q' to open options menu{RESET}")
-    print(f"{MAGENTA}----------------------------------------{RESET}")
+def live_view(snapshot, sort_by, filter_by, filter_value, refresh_interval=0.5, columns=None):
+    """Redraw the header and visible process rows in place until Ctrl+C."""
+    renderer = FrameRenderer()
+    renderer.stream.write(HIDE_CURSOR)
+    try:
+        while True:
+            processes = get_process_list(sort_by, filter_by, filter_value, snapshot)
+            header = build_header_lines(refresh_interval, sort_by, filter_by, filter_value,
+                                        hint="Live view - press Ctrl+C to return")
+            height, _ = renderer.viewport()
+            # Only the rows that fit in the viewport are formatted
+            rows = format_process_entries(processes, max(height - len(header) - 1, 0), columns)
+            renderer.render(header + rows)
+            time.sleep(refresh_interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        renderer.stream.write(SHOW_CURSOR + CLEAR)
+        renderer.stream.flush()
 
 def options_menu():
     """Display the options menu and handle user input."""
@@ -110,8 +1636,16 @@ def options_menu():
     print(f"{CYAN}2. Save Current Output{RESET}")
     print(f"{CYAN}3. Kill Multiple Processes{RESET}")
     print(f"{CYAN}4. Export to CSV{RESET}")
-    print(f"{CYAN}5. Quit{RESET}")
-    choice = input(f"{CYAN}Enter your choice (1-5): {RESET}").strip()
+    print(f"{CYAN}5. Show Top Processes (last 60s){RESET}")
+    print(f"{CYAN}6. Live View{RESET}")
+    print(f"{CYAN}7. Switch Selector (fzf/built-in){RESET}")
+    print(f"{CYAN}8. Set Filter Expression{RESET}")
+    print(f"{CYAN}9. Process Tree{RESET}")
+    print(f"{CYAN}10. Group View (by name, user or cgroup){RESET}")
+    print(f"{CYAN}11. Sockets by Process (Linux){RESET}")
+    print(f"{CYAN}12. Set Extra Columns{RESET}")
+    print(f"{CYAN}13. Quit{RESET}")
+    choice = input(f"{CYAN}Enter your choice (1-13): {RESET}").strip()
     return choice
 
 def save_process_list(processes):
@@ -119,29 +1653,383 @@ def save_process_list(processes):
     timestamp = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
     filename = f"process_list_{timestamp}.txt"
     with open(filename, 'w') as file:
-        file.write("\n".join(processes))
+        for record in processes:
+            file.write(format_process_entry(record) + "\n")
     print(f"{GREEN}Process list saved to {filename}.{RESET}")
 
 def export_to_csv(processes):
     """Export the process list to a CSV file."""
     timestamp = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
     filename = f"process_list_{timestamp}.csv"
-    with open(filename, 'w') as file:
-        file.write("PID,Name,Username,Status,Memory Usage (MB),CPU Usage (%),Creation Time\n")
-        for process in processes:
-            file.write(process.replace(" | ", ",") + "\n")
+    with open(filename, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(CSV_HEADER)
+        writer.writerows(record.as_row() for record in processes)
     print(f"{GREEN}Process list exported to {filename}.{RESET}")
 
+def replay_view(path, sort_by="pid", filter_by=None, filter_value=None, speed=1.0, start=None):
+    """Step through a recording in the live view layout at the given speed until Ctrl+C."""
+    renderer = FrameRenderer()
+    predicate = build_filter(filter_by, filter_value)
+    renderer.stream.write(HIDE_CURSOR)
+    try:
+        with SnapshotPlayer(path) as player:
+            previous = None
+            for position, (timestamp, records) in enumerate(player.frames(start), player.index_at(start or 0)):
+                if previous is not None and speed > 0:
+                    time.sleep((timestamp - previous) / speed)
+                previous = timestamp
+                processes = sort_processes([r for r in records if predicate is None or predicate(r)], sort_by)
+                header = [
+                    f"{BOLD}{BLUE}=== Process Manager (replay) ==={RESET}",
+                    f"{CYAN}{path} | Frame {position + 1}/{len(player)} | {format_create_time(timestamp)} | Speed: {speed}x{RESET}",
+                    f"{CYAN}Sort By: {sort_by} | Filter: {filter_by}={filter_value} | Processes: {len(processes)}{RESET}",
+                    f"{MAGENTA}Replay - press Ctrl+C to stop{RESET}",
+                    f"{MAGENTA}----------------------------------------{RESET}",
+                ]
+                height, _ = renderer.viewport()
+                renderer.render(header + format_process_entries(processes, max(height - len(header) - 1, 0)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        renderer.stream.write(SHOW_CURSOR)
+        renderer.stream.flush()
+
+def kill_process_tree(tree, pid):
+    """Terminate pid and all of its descendants in one bulk pass."""
+    report_kill_results(*terminate_processes(tree.subtree_pids(pid)))
+
+def tree_view(snapshot, tree, refresh_interval):
+    """Browse the process tree; Enter toggles a subtree and 'k' kills it."""
+    renderer = FrameRenderer()
+    selected = 0
+    refresh_due = 0.0
+    header = []
+    renderer.stream.write(HIDE_CURSOR)
+    try:
+        with raw_terminal():
+            while True:
+                if time.monotonic() >= refresh_due:
+                    snapshot.refresh()
+                    header = [
+                        f"{BOLD}{BLUE}=== Process Tree ==={RESET}",
+                        f"{CYAN}Processes: {len(tree)} | Refresh Interval: {refresh_interval} seconds{RESET}",
+                        f"{MAGENTA}Up/Down to move | Enter to expand/collapse | k to kill subtree | Esc to return{RESET}",
+                        f"{MAGENTA}{'PID':<8} | {'Name':<40} | {'Own RSS':>11} | {'Tree RSS':>12} | {'Tree CPU':>7}{RESET}",
+                    ]
+                    refresh_due = time.monotonic() + refresh_interval
+                rows = tree.rows()
+                height, _ = renderer.viewport()
+                page = max(height - len(header) - 1, 1)
+                selected = max(min(selected, len(rows) - 1), 0)
+                start = max(selected - page + 1, 0)
+                lines = []
+                for index, (depth, record) in enumerate(rows[start:start + page], start):
+                    line = format_tree_entry(tree, depth, record)
+                    lines.append(f"{REVERSE}{line}{RESET}" if index == selected else line)
+                renderer.render(header + lines)
+
+                event = read_key(max(refresh_due - time.monotonic(), 0))
+                if event is None:
+                    continue
+                key, text = event
+                if key == "escape":
+                    return
+                moved = move_selection(key, selected, page)
+                if moved is not None:
+                    selected = moved
+                elif rows and (key == "enter" or text == " "):
+                    tree.toggle(rows[selected][1].pid)
+                elif rows and text == "k":
+                    record = rows[selected][1]
+                    count = len(tree.subtree_pids(record.pid))
+                    renderer.stream.write(f"\033[{height};1H{RED}Kill {record.name} ({record.pid}) and {count - 1} descendants? (y/n){RESET}{CLEAR_LINE}")
+                    renderer.stream.flush()
+                    if read_key(60) == (None, "y"):
+                        renderer.stream.write(CLEAR)
+                        kill_process_tree(tree, record.pid)
+                        time.sleep(1)  # Pause to show feedback before refreshing
+                        refresh_due = 0.0
+                    renderer.reset()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        renderer.stream.write(SHOW_CURSOR + CLEAR)
+        renderer.stream.flush()
+
+def group_view(snapshot, groups, sort_by, refresh_interval):
+    """Browse group aggregates; Enter drills into a group and 'g' changes the grouping.
+
+    Returns the ProcessGroups in use, which may have been replaced by 'g'.
+    """
+    renderer = FrameRenderer()
+    selected = 0
+    refresh_due = 0.0
+    drilled = None  # Group being shown member by member
+    group_modes = list(GROUP_KEYS)
+    renderer.stream.write(HIDE_CURSOR)
+    try:
+        with raw_terminal():
+            while True:
+                if time.monotonic() >= refresh_due:
+                    snapshot.refresh()
+                    refresh_due = time.monotonic() + refresh_interval
+                if drilled is None:
+                    items = groups.rows(sort_by)
+                    title = f"Groups by {groups.group_by}: {len(groups)}"
+                    hint = "Up/Down to move | Enter to show members | g to change grouping | Esc to return"
+                else:
+                    items = sort_processes(groups.members(drilled), sort_by)
+                    title = f"Group {drilled}: {len(items)} processes"
+                    hint = "Up/Down to move | Esc to go back to groups"
+                header = [
+                    f"{BOLD}{BLUE}=== Process Groups ==={RESET}",
+                    f"{CYAN}{title} | Sort By: {sort_by} | Refresh Interval: {refresh_interval} seconds{RESET}",
+                    f"{MAGENTA}{hint}{RESET}",
+                    f"{MAGENTA}----------------------------------------{RESET}",
+                ]
+                height, _ = renderer.viewport()
+                page = max(height - len(header) - 1, 1)
+                selected = max(min(selected, len(items) - 1), 0)
+                start = max(selected - page + 1, 0)
+                visible = items[start:start + page]
+                lines = [format_group_entry(item) for item in visible] if drilled is None else format_process_entries(visible)
+                lines = [f"{REVERSE}{line}{RESET}" if start + i == selected else line for i, line in enumerate(lines)]
+                renderer.render(header + lines)
+
+                event = read_key(max(refresh_due - time.monotonic(), 0))
+                if event is None:
+                    continue
+                key, text = event
+                moved = move_selection(key, selected, page)
+                if moved is not None:
+                    selected = moved
+                elif key == "escape":
+                    if drilled is None:
+                        return groups
+                    drilled = None
+                    selected = 0
+                elif key == "enter" and drilled is None and items:
+                    drilled = items[selected].name
+                    selected = 0
+                elif text == "g" and drilled is None:
+                    # Regroup from the current records under the next grouping mode
+                    group_by = group_modes[(group_modes.index(groups.group_by) + 1) % len(group_modes)]
+                    snapshot.listeners.remove(groups.update)
+                    groups = ProcessGroups(group_by)
+                    groups.update(snapshot)
+                    snapshot.listeners.append(groups.update)
+                    selected = 0
+    except KeyboardInterrupt:
+        return groups
+    finally:
+        renderer.stream.write(SHOW_CURSOR + CLEAR)
+        renderer.stream.flush()
+
+def socket_view(snapshot, socket_map, refresh_interval, port=None):
+    """Show sockets and their owning processes, optionally only those using port."""
+    renderer = FrameRenderer()
+    selected = 0
+    refresh_due = 0.0
+    sockets = []
+    renderer.stream.write(HIDE_CURSOR)
+    try:
+        with raw_terminal():
+            while True:
+                if time.monotonic() >= refresh_due:
+                    snapshot.refresh()
+                    sockets = socket_map.refresh(snapshot)
+                    if port is not None:
+                        sockets = [e for e in sockets if port in (e.local_port, e.remote_port)]
+                    sockets.sort(key=lambda e: (e.proto, e.local_port, e.remote_address, e.remote_port))
+                    refresh_due = time.monotonic() + refresh_interval
+                header = [
+                    f"{BOLD}{BLUE}=== Sockets by Process ==={RESET}",
+                    f"{CYAN}Sockets: {len(sockets)} | Port: {port if port is not None else 'any'} | "
+                    f"Processes scanned: {socket_map.scanned} | Refresh Interval: {refresh_interval} seconds{RESET}",
+                    f"{MAGENTA}Up/Down to move | Esc to return{RESET}",
+                    f"{MAGENTA}{'Proto':<5} | {'Local Address':<28} | {'Remote Address':<28} | {'State':<12} | {'PID':<8} | Name{RESET}",
+                ]
+                height, _ = renderer.viewport()
+                page = max(height - len(header) - 1, 1)
+                selected = max(min(selected, len(sockets) - 1), 0)
+                start = max(selected - page + 1, 0)
+                lines = [format_socket_entry(entry) for entry in sockets[start:start + page]]
+                lines = [f"{REVERSE}{line}{RESET}" if start + i == selected else line for i, line in enumerate(lines)]
+                renderer.render(header + lines)
+
+                event = read_key(max(refresh_due - time.monotonic(), 0))
+                if event is None:
+                    continue
+                key, _ = event
+                moved = move_selection(key, selected, page)
+                if moved is not None:
+                    selected = moved
+                elif key == "escape":
+                    return
+    except KeyboardInterrupt:
+        pass
+    finally:
+        renderer.stream.write(SHOW_CURSOR + CLEAR)
+        renderer.stream.flush()
+
+def show_history_top(history, n=10, window=60):
+    """Print the busiest and fastest-growing processes over a time window."""
+    print(f"{BOLD}{BLUE}=== Top {n} by average CPU (last {window}s) ==={RESET}")
+    for record, average in history.top_by_average_cpu(n, window):
+        print(f"{record.pid:<8} | {record.name:<20} | {average:>6.1f}%")
+    print(f"{BOLD}{BLUE}=== Top {n} by RSS growth (last {window}s) ==={RESET}")
+    for record, growth in history.fastest_growing_rss(n, window):
+        print(f"{record.pid:<8} | {record.name:<20} | {growth / 1024:>10.1f} KB/s")
+    input(f"{CYAN}Press Enter to continue...{RESET}")
+
+def _is_zombie(proc):
+    """True if the process is dead but not reaped yet by its (possibly new) parent."""
+    try:
+        return proc.status() == psutil.STATUS_ZOMBIE
+    except psutil.NoSuchProcess:
+        return True
+
+def terminate_processes(pids, include_children=False, timeout=3.0):
+    """Terminate many processes at once, escalating to SIGKILL for survivors.
+
+    SIGTERM is sent to every target (and their descendants when
+    include_children is set), all of them are awaited together with
+    psutil.wait_procs, and whatever is still alive after timeout gets
+    SIGKILL and a second wait. Returns ({pid: outcome}, elapsed seconds) where
+    outcome is "terminated", "killed", "survived", "not found" or "access denied".
+    """
+    start = time.perf_counter()
+    outcomes = {}
+    targets = {}
+    for pid in pids:
+        try:
+            proc = psutil.Process(pid)
+            targets.setdefault(pid, proc)
+            if include_children:
+                for child in proc.children(recursive=True):
+                    targets.setdefault(child.pid, child)
+        except psutil.NoSuchProcess:
+            outcomes[pid] = "not found"
+        except psutil.AccessDenied:
+            outcomes[pid] = "access denied"
+
+    def signal_all(procs, send):
+        signalled = []
+        for proc in procs:
+            try:
+                send(proc)
+                signalled.append(proc)
+            except psutil.NoSuchProcess:
+                outcomes[proc.pid] = "terminated"  # Exited before the signal arrived
+            except psutil.AccessDenied:
+                outcomes[proc.pid] = "access denied"
+        return signalled
+
+    _, alive = psutil.wait_procs(signal_all(targets.values(), psutil.Process.terminate), timeout=timeout)
+    alive = [proc for proc in alive if not _is_zombie(proc)]
+    for pid in targets:
+        outcomes.setdefault(pid, "terminated")
+    if alive:
+        # Only procs that actually received SIGKILL are "killed"; the rest keep the outcome signal_all recorded
+        killed = signal_all(alive, psutil.Process.kill)
+        for proc in killed:
+            outcomes[proc.pid] = "killed"
+        _, survivors = psutil.wait_procs(killed, timeout=timeout)
+        for proc in survivors:
+            if not _is_zombie(proc):
+                outcomes[proc.pid] = "survived"
+    return outcomes, time.perf_counter() - start
+
+def report_kill_results(outcomes, elapsed):
+    """Print per-PID outcomes of terminate_processes with colorful feedback."""
+    colors = {"terminated": GREEN, "killed": YELLOW}
+    for pid, outcome in sorted(outcomes.items()):
+        print(f"{colors.get(outcome, RED)}Process {pid}: {outcome}{RESET}")
+    print(f"{CYAN}{len(outcomes)} processes handled in {elapsed:.2f} seconds.{RESET}")
+
+# Columns available to the streaming exporter: name -> getter(timestamp, record)
+EXPORT_COLUMNS = {
+    "timestamp": lambda timestamp, record: timestamp,
+    "pid": lambda timestamp, record: record.pid,
+    "name": lambda timestamp, record: record.name,
+    "username": lambda timestamp, record: record.username,
+    "status": lambda timestamp, record: record.status,
+    "rss": lambda timestamp, record: record.rss,
+    "cpu_percent": lambda timestamp, record: record.cpu_percent,
+    "create_time": lambda timestamp, record: record.create_time,
+    "ppid": lambda timestamp, record: record.ppid,
+}
+
+def iter_snapshot_rows(records, timestamp=None):
+    """Yield (timestamp, record) pairs for one snapshot."""
+    timestamp = time.time() if timestamp is None else timestamp
+    for record in records:
+        yield timestamp, record
+
+def iter_history_rows(path, start=None, end=None):
+    """Yield (timestamp, record) pairs from a recording, one frame in memory at a time."""
+    with SnapshotPlayer(path) as player:
+        for timestamp, records in player.frames(start, end):
+            if start is not None and timestamp < start:
+                continue
+            for record in records:
+                yield timestamp, record
+
+def history_export_columns(path, columns=None):
+    """Return the export columns a recording can fill, refusing ppid for old recordings."""
+    with SnapshotPlayer(path) as player:
+        has_ppid = player.has_ppid
+    if has_ppid:
+        return list(columns or EXPORT_COLUMNS)
+    if columns and "ppid" in columns:
+        raise ValueError(f"{path} was recorded without parent PIDs; drop ppid from the export columns")
+    return [column for column in columns or EXPORT_COLUMNS if column != "ppid"]
+
+def export_records(rows, path, output_format="csv", columns=None, buffer_size=64 * 1024):
+    """Stream (timestamp, record) rows to CSV or NDJSON, gzip-compressed if path ends in .gz.
+
+    Rows are written as they arrive through a buffer of buffer_size bytes,
+    so memory stays constant however long the input is. Returns the number
+    of rows written.
+    """
+    columns = list(columns or EXPORT_COLUMNS)
+    unknown = [column for column in columns if column not in EXPORT_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown export column(s): {', '.join(unknown)}")
+    if output_format not in ("csv", "ndjson"):
+        raise ValueError(f"Unknown export format: {output_format!r}")
+    getters = [EXPORT_COLUMNS[column] for column in columns]
+    if path.endswith(".gz"):
+        file = io.TextIOWrapper(io.BufferedWriter(gzip.GzipFile(path, "wb"), buffer_size), newline="")
+    else:
+        file = open(path, "w", newline="", buffering=buffer_size)
+    count = 0
+    with file:
+        if output_format == "csv":
+            writer = csv.writer(file)
+            writer.writerow(columns)
+            for timestamp, record in rows:
+                writer.writerow([get(timestamp, record) for get in getters])
+                count += 1
+        else:
+            for timestamp, record in rows:
+                file.write(json.dumps(dict(zip(columns, (get(timestamp, record) for get in getters)))) + "\n")
+                count += 1
+    return count
+
 def kill_multiple_processes():
     """Kill multiple processes by their PIDs."""
     pids = input(f"{CYAN}Enter PIDs to kill (comma-separated): {RESET}").strip().split(',')
-    for pid in pids:
-        if pid.strip().isdigit():
-            kill_process(int(pid.strip()))
+    pids = [int(pid.strip()) for pid in pids if pid.strip().isdigit()]
+    if not pids:
+        return
+    include_children = input(f"{CYAN}Also kill their child processes? (y/n): {RESET}").strip().lower() == 'y'
+    report_kill_results(*terminate_processes(pids, include_children))
 
 def select_process_with_fzf(processes):
     """Use fzf to select a process from the list with custom formatting."""
-    process_list = "\n".join(processes)
+    process_list = "\n".join(format_process_entries(processes))
     result = subprocess.run(
         [
             "fzf",
@@ -156,21 +2044,475 @@ def select_process_with_fzf(processes):
         return result.stdout.strip()
     return None  # No selection
 
-def main():
-    refresh_interval = 2  # Default refresh interval in seconds
-    sort_by = "pid"  # Default sorting
-    filter_by = None  # Default filter
-    filter_value = None  # Default filter value
+def fuzzy_score(query, text):
+    """Score a lowercase query as a subsequence of lowercase text; None if it does not match."""
+    score = 0
+    position = 0
+    previous = -2
+    for char in query:
+        index = text.find(char, position)
+        if index < 0:
+            return None
+        score += 1
+        if index == previous + 1:
+            score += 3  # Consecutive characters
+        if index == 0 or text[index - 1] in " /_-.":
+            score += 2  # Start of a word
+        previous = index
+        position = index + 1
+    if query in text:
+        score += 10  # Plain substring match
+    return score
+
+class FuzzySelector:
+    """Incremental fuzzy matcher over process records.
+
+    A lowercase search string is built once per process and reused across
+    refreshes. Results are kept per query prefix, so typing another character
+    only re-scores the previous result set and backspace pops back a level.
+    """
+
+    def __init__(self):
+        self.query = ""
+        self._index = {}  # (pid, create_time) -> (lowercase text, record)
+        self._levels = []  # _levels[i] holds the sorted matches for query[:i + 1]
+
+    def __len__(self):
+        return len(self._index)
+
+    def update(self, records):
+        """Replace the candidate set, keeping cached lowercase text for known processes."""
+        index = {}
+        for record in records:
+            entry = self._index.get(record.key)
+            text = entry[0] if entry else f"{record.pid} {record.name} {record.username}".lower()
+            index[record.key] = (text, record)
+        self._index = index
+        self._levels = []  # Rebuilt lazily against the new candidates
+
+    def push(self, char):
+        self.query += char
+
+    def pop(self):
+        self.query = self.query[:-1]
+        del self._levels[len(self.query):]
+
+    def results(self):
+        """Return the matching records, best match first."""
+        if not self.query:
+            return [record for _, record in self._index.values()]
+        while len(self._levels) < len(self.query):
+            query = self.query[:len(self._levels) + 1].lower()
+            candidates = self._levels[-1] if self._levels else self._index.values()
+            scored = []
+            for text, record in candidates:
+                score = fuzzy_score(query, text)
+                if score is not None:
+                    scored.append((score, text, record))
+            scored.sort(key=lambda item: item[0], reverse=True)  # Stable, keeps sort_by order on ties
+            self._levels.append([(text, record) for _, text, record in scored])
+        return [record for _, record in self._levels[-1]]
+
+@contextmanager
+def raw_terminal():
+    """Put stdin in cbreak mode so single keys can be read without Enter."""
+    if termios is None or not sys.stdin.isatty():
+        yield
+        return
+    fd = sys.stdin.fileno()
+    saved = termios.tcgetattr(fd)
+    try:
+        tty.setcbreak(fd)
+        yield
+    finally:
+        termios.tcsetattr(fd, termios.TCSADRAIN, saved)
+
+# Escape sequences mapped to key names for the built-in selector
+KEY_SEQUENCES = {
+    "\x1b[A": "up", "\x1b[B": "down", "\x1bOA": "up", "\x1bOB": "down",
+    "\x1b[5~": "pageup", "\x1b[6~": "pagedown",
+    "\r": "enter", "\n": "enter", "\x7f": "backspace", "\x08": "backspace",
+    "\x1b": "escape", "\x03": "escape",
+}
+WINDOWS_KEYS = {"H": "up", "P": "down", "I": "pageup", "Q": "pagedown"}
+
+def read_key(timeout):
+    """Wait up to timeout seconds for input.
+
+    Returns (key name, None) for special keys, (None, text) for typed text,
+    or None when nothing was pressed.
+    """
+    if msvcrt is not None:
+        deadline = time.monotonic() + timeout
+        while not msvcrt.kbhit():
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(0.02)
+        data = msvcrt.getwch()
+        if data in ("\x00", "\xe0"):
+            return WINDOWS_KEYS.get(msvcrt.getwch()), None
+    else:
+        ready, _, _ = select.select([sys.stdin], [], [], timeout)
+        if not ready:
+            return None
+        data = os.read(sys.stdin.fileno(), 32).decode(errors="ignore")
+    if data in KEY_SEQUENCES:
+        return KEY_SEQUENCES[data], None
+    return None, data if data.isprintable() else ""
+
+def move_selection(key, selected, page):
+    """Return the selection after a navigation key, or None if key does not navigate."""
+    steps = {"up": -1, "down": 1, "pageup": -page, "pagedown": page}
+    return selected + steps[key] if key in steps else None
+
+def select_process_builtin(snapshot, sort_by, filter_by, filter_value, refresh_interval, columns=None):
+    """Pick a process with the in-process fuzzy selector.
+
+    The candidate list keeps refreshing while the user types. Returns the
+    latest process list and the selected record (or None when cancelled).
+    """
+    selector = FuzzySelector()
+    renderer = FrameRenderer()
+    selected = 0
+    refresh_due = 0.0
+    processes = []
+    header = []
+    renderer.stream.write(HIDE_CURSOR)
+    try:
+        with raw_terminal():
+            while True:
+                if time.monotonic() >= refresh_due:
+                    processes = get_process_list(sort_by, filter_by, filter_value, snapshot)
+                    selector.update(processes)
+                    header = build_header_lines(refresh_interval, sort_by, filter_by, filter_value,
+                                                hint="Type to filter | Up/Down to move | Enter to select | Esc to cancel")
+                    refresh_due = time.monotonic() + refresh_interval
+
+                matches = selector.results()
+                height, _ = renderer.viewport()
+                page = max(height - len(header) - 2, 1)
+                selected = max(min(selected, len(matches) - 1), 0)
+                start = max(selected - page + 1, 0)
+                rows = format_process_entries(matches[start:start + page], columns=columns)
+                rows = [f"{REVERSE}{row}{RESET}" if start + i == selected else row for i, row in enumerate(rows)]
+                prompt = f"{BOLD}> {selector.query}{RESET}  {CYAN}{len(matches)}/{len(selector)}{RESET}"
+                renderer.render(header + [prompt] + rows)
+
+                event = read_key(max(refresh_due - time.monotonic(), 0))
+                if event is None:
+                    continue
+                key, text = event
+                if key == "enter":
+                    return processes, matches[selected] if matches else None
+                if key == "escape":
+                    return processes, None
+                moved = move_selection(key, selected, page)
+                if moved is not None:
+                    selected = moved
+                elif key == "backspace":
+                    selector.pop()
+                    selected = 0
+                elif text:
+                    for char in text:  # Fast typing can deliver several characters at once
+                        selector.push(char)
+                    selected = 0
+    except KeyboardInterrupt:
+        return processes, None
+    finally:
+        renderer.stream.write(SHOW_CURSOR + CLEAR)
+        renderer.stream.flush()
+
+def run_batch(iterations, interval, sort_by="pid", filter_by=None, filter_value=None, limit=None,
+              output=None, output_format="ndjson", listeners=()):
+    """Sample processes without any interaction, like top -b.
+
+    Writes one JSON document per snapshot (NDJSON), or a single JSON array of
+    snapshots with output_format="json", to stdout or the output file.
+    iterations of 0 samples until interrupted. listeners (such as a recorder
+    or watch rules) are run after every refresh.
+    """
+    snapshot = create_snapshot()
+    snapshot.refresh()  # Prime CPU counters so the first sample is meaningful
+    snapshot.listeners.extend(listeners)
+    stream = open(output, "w") if output else sys.stdout
+    count = 0
+    try:
+        if output_format == "json":
+            stream.write("[")
+        while not iterations or count < iterations:
+            time.sleep(interval)
+            processes = get_process_list(sort_by, filter_by, filter_value, snapshot)
+            document = {
+                "timestamp": time.time(),
+                "system": get_system_metrics(),
+                "count": len(processes),
+                "processes": [record.as_dict() for record in processes[:limit]],
+            }
+            if output_format == "json":
+                stream.write(("," if count else "") + json.dumps(document))
+            else:
+                stream.write(json.dumps(document) + "\n")
+            stream.flush()
+            count += 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if output_format == "json":
+            stream.write("]\n")
+        if stream is not sys.stdout:
+            stream.close()
+    return count
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def render_metrics(system, processes, top_n=10, duration=0.0, timestamp=None):
+    """Render system metrics and the top-N processes in Prometheus text format.
+
+    Only the top_n processes by CPU and by RSS get per-process series, which
+    keeps label cardinality bounded no matter how many processes exist.
+    """
+    timestamp = time.time() if timestamp is None else timestamp
+    lines = []
+
+    def gauge(name, help_text, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        for labels, value in samples:
+            label_text = ",".join(f'{key}="{_escape_label(val)}"' for key, val in labels)
+            lines.append(f"{name}{{{label_text}}} {value}" if labels else f"{name} {value}")
+
+    gauge("taskmanager_memory_total_bytes", "Total physical memory.", [((), system["memory_total"])])
+    gauge("taskmanager_memory_used_bytes", "Used physical memory.", [((), system["memory_used"])])
+    gauge("taskmanager_cpu_percent", "System-wide CPU utilization.", [((), system["cpu_percent"])])
+    gauge("taskmanager_disk_used_percent", "Disk usage of the root filesystem.", [((), system["disk_percent"])])
+    gauge("taskmanager_processes", "Number of visible processes.", [((), len(processes))])
+    by_cpu = sorted(processes, key=attrgetter("cpu_percent"), reverse=True)[:top_n]
+    gauge("taskmanager_process_cpu_percent", f"CPU utilization of the top {top_n} processes by CPU.",
+          [((("pid", r.pid), ("name", r.name)), r.cpu_percent) for r in by_cpu])
+    by_rss = sorted(processes, key=attrgetter("rss"), reverse=True)[:top_n]
+    gauge("taskmanager_process_resident_bytes", f"Resident memory of the top {top_n} processes by RSS.",
+          [((("pid", r.pid), ("name", r.name)), r.rss) for r in by_rss])
+    gauge("taskmanager_sample_duration_seconds", "Time taken to collect the last sample.", [((), round(duration, 6))])
+    gauge("taskmanager_sample_timestamp_seconds", "When the last sample was collected.", [((), timestamp)])
+    return "\n".join(lines) + "\n"
+
+metrics_logger = logging.getLogger("taskmaneger.metrics")
+
+class MetricsSampler(threading.Thread):
+    """Background thread that precomputes the /metrics payload once per interval.
+
+    Scrapes only read the cached payload, so they never trigger psutil calls.
+    """
+
+    def __init__(self, interval=5, top_n=10, snapshot=None):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.top_n = top_n
+        self.snapshot = snapshot or create_snapshot()
+        self.payload = b""
+        self._stop_event = threading.Event()
+
+    def sample(self):
+        start = time.perf_counter()
+        processes = self.snapshot.refresh()
+        system = get_system_metrics()
+        duration = time.perf_counter() - start
+        # A single assignment swaps the payload atomically for concurrent scrapes
+        self.payload = render_metrics(system, processes, self.top_n, duration).encode()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.sample()
+            except Exception:
+                # A failing listener (e.g. the recorder on a full disk) must not stop sampling
+                metrics_logger.exception("Metrics sample failed; keeping the previous payload")
+
+    def stop(self):
+        self._stop_event.set()
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Serve the sampler's cached payload on /metrics."""
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        payload = self.server.sampler.payload
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass  # Keep scrapes out of the terminal
+
+def start_metrics_server(host="127.0.0.1", port=9256, interval=5, top_n=10, listeners=()):
+    """Start the sampler thread and return an HTTP server ready for serve_forever().
+
+    Use port 0 to bind an ephemeral port; see server.server_address.
+    """
+    sampler = MetricsSampler(interval, top_n)
+    sampler.snapshot.refresh()  # Prime CPU counters before the first published sample
+    sampler.sample()
+    sampler.snapshot.listeners.extend(listeners)
+    sampler.start()
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.sampler = sampler
+    return server
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Interactive process manager with a headless batch mode.")
+    parser.add_argument("-b", "--batch", action="store_true", help="Run non-interactively and print JSON snapshots")
+    parser.add_argument("-n", "--iterations", type=int, default=1, help="Snapshots to take in batch mode (0 = until interrupted)")
+    parser.add_argument("-d", "--interval", type=float, default=2, help="Seconds between refreshes")
+    parser.add_argument("-s", "--sort", choices=sorted(SORT_KEYS), default="pid", help="Sort column")
+    parser.add_argument("-f", "--filter", default=None, help="Filter expression, e.g. 'name~^py rss>500M'")
+    parser.add_argument("-l", "--limit", type=int, default=None, help="Maximum processes per snapshot in batch mode")
+    parser.add_argument("-o", "--output", default=None, help="Write batch output to this file instead of stdout")
+    parser.add_argument("--format", choices=["ndjson", "json"], default="ndjson", help="Batch output format")
+    parser.add_argument("--record", metavar="FILE", default=None, help="Append every snapshot to a compact recording")
+    parser.add_argument("--replay", metavar="FILE", default=None, help="Replay a recording instead of sampling")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed multiplier (0 = as fast as possible)")
+    parser.add_argument("--columns", type=lambda text: [c.strip() for c in text.split(",") if c.strip()], default=[],
+                        help=f"Extra columns for visible rows: {','.join(LAZY_COLUMNS)}")
+    parser.add_argument("--watch", metavar="FILE", default=None, help="Evaluate the watch rules in FILE on every refresh")
+    parser.add_argument("--serve-metrics", metavar="PORT", type=int, default=None,
+                        help="Serve Prometheus metrics on this port instead of running the UI")
+    parser.add_argument("--metrics-host", default="127.0.0.1", help="Address for the metrics endpoint")
+    parser.add_argument("--top", type=int, default=10, help="Per-process series to export for each metric")
+    parser.add_argument("--start", default=None, help="Replay/export start time ('YYYY-MM-DD HH:MM:SS' or epoch seconds)")
+    parser.add_argument("--end", default=None, help="Export end time ('YYYY-MM-DD HH:MM:SS' or epoch seconds)")
+    parser.add_argument("--export", metavar="FILE", default=None,
+                        help="Stream the current processes (or the --replay recording) to FILE; .gz compresses")
+    parser.add_argument("--export-format", choices=["csv", "ndjson"], default="csv", help="Export format")
+    parser.add_argument("--export-columns", default=None, help=f"Export columns: {','.join(EXPORT_COLUMNS)}")
+    args = parser.parse_args(argv)
+    for option in ("start", "end"):
+        value = getattr(args, option)
+        if value:
+            try:
+                setattr(args, option, float(value))
+            except ValueError:
+                try:
+                    setattr(args, option, datetime.strptime(value, '%Y-%m-%d %H:%M:%S').timestamp())
+                except ValueError:
+                    parser.error(f"Invalid --{option} time: {value!r}")
+    if args.export_columns:
+        args.export_columns = [c.strip() for c in args.export_columns.split(",") if c.strip()]
+        unknown = [column for column in args.export_columns if column not in EXPORT_COLUMNS]
+        if unknown:
+            parser.error(f"Unknown export column(s): {', '.join(unknown)}")
+    if args.filter:
+        try:
+            compile_filter(args.filter)
+        except ValueError as e:
+            parser.error(str(e))
+    unknown = [column for column in args.columns if column not in LAZY_COLUMNS]
+    if unknown:
+        parser.error(f"Unknown column(s): {', '.join(unknown)}")
+    if args.watch:
+        try:
+            load_watch_rules(args.watch)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+    if args.record:
+        try:
+            SnapshotRecorder(args.record).close()
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+    if args.export and args.replay:
+        try:
+            args.export_columns = history_export_columns(args.replay, args.export_columns)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    filter_by, filter_value = ("expr", args.filter) if args.filter else (None, None)
+    if args.export:
+        if args.replay:
+            rows = iter_history_rows(args.replay, args.start, args.end)
+        else:
+            rows = iter_snapshot_rows(get_process_list(args.sort, filter_by, filter_value))
+        if filter_by:
+            predicate = build_filter(filter_by, filter_value)
+            rows = (row for row in rows if predicate(row[1]))
+        count = export_records(rows, args.export, args.export_format, args.export_columns)
+        print(f"{GREEN}Exported {count} rows to {args.export}.{RESET}")
+        return
+    if args.replay:
+        replay_view(args.replay, args.sort, filter_by, filter_value, args.speed, args.start)
+        return
+    recorder = SnapshotRecorder(args.record) if args.record else None
+    watch = load_watch_rules(args.watch) if args.watch else None
+    listeners = [recorder.record] if recorder is not None else []
+    if watch is not None:
+        listeners.append(watch.evaluate)
+
+    if args.serve_metrics is not None:
+        server = start_metrics_server(args.metrics_host, args.serve_metrics, args.interval, args.top, listeners)
+        host, port = server.server_address[:2]
+        print(f"{GREEN}Serving metrics on http://{host}:{port}/metrics (Ctrl+C to stop){RESET}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.sampler.stop()
+            server.server_close()
+            if recorder is not None:
+                recorder.close()
+        return
+    if args.batch:
+        try:
+            run_batch(args.iterations, args.interval, args.sort, filter_by, filter_value,
+                      args.limit, args.output, args.format, listeners)
+        finally:
+            if recorder is not None:
+                recorder.close()
+        return
+
+    refresh_interval = args.interval  # Refresh interval in seconds
+    sort_by = args.sort  # Sorting column
+    snapshot = create_snapshot()  # Reused across refreshes for incremental updates
+    history = ProcessHistory()  # CPU/RSS ring buffers fed by every refresh
+    snapshot.listeners.append(history.record)
+    snapshot.listeners.extend(listeners)
+    tree = None  # Process tree index, built on first use
+    groups = None  # Group aggregates, built on first use
+    socket_map = None  # Socket inode cache, built on first use
+    lazy_columns = LazyColumns(args.columns)  # Optional expensive columns, fetched per visible row
+    snapshot.listeners.append(lazy_columns.forget)
+    selector_backend = "fzf" if shutil.which("fzf") else "builtin"  # Process picker
 
     while True:
-        display_header(refresh_interval, sort_by, filter_by, filter_value)
-        processes = get_process_list(sort_by, filter_by, filter_value)
+        pid = None
+        record = None
+        if selector_backend == "fzf":
+            display_header(refresh_interval, sort_by, filter_by, filter_value)
+            processes = get_process_list(sort_by, filter_by, filter_value, snapshot)
 
-        # Use fzf to select a process
-        selected_process = select_process_with_fzf(processes)
+            # Use fzf to select a process
+            selected_process = select_process_with_fzf(processes)
+            if selected_process:
+                pid = int(selected_process.split('|')[0].strip())
+                record = next((r for r in processes if r.pid == pid), None)
+        else:
+            # Built-in selector refreshes the list live while typing
+            processes, record = select_process_builtin(snapshot, sort_by, filter_by, filter_value,
+                                                       refresh_interval, lazy_columns)
+            if record is not None:
+                pid = record.pid
 
-        if selected_process:
-            pid = int(selected_process.split('|')[0].strip())
+        if pid is not None:
+            if record is not None and lazy_columns.columns:
+                # Expensive columns are only fetched for the selected process
+                for line in lazy_columns.details(record):
+                    print(f"{YELLOW}{line}{RESET}")
             action = input(f"{CYAN}Selected PID: {pid}. Do you want to kill this process? (y/n): {RESET}").lower()
 
             if action == 'y':
@@ -197,6 +2539,63 @@ def main():
                     export_to_csv(processes)
                     time.sleep(1)  # Pause to show feedback before refreshing
                 elif choice == '5':
+                    # Windowed top-N from the history buffers
+                    show_history_top(history)
+                elif choice == '6':
+                    # In-place differential view
+                    live_view(snapshot, sort_by, filter_by, filter_value, columns=lazy_columns)
+                    continue
+                elif choice == '7':
+                    # Toggle between fzf and the in-process selector
+                    selector_backend = "builtin" if selector_backend == "fzf" else "fzf"
+                    print(f"{GREEN}Using the {selector_backend} selector.{RESET}")
+                    time.sleep(1)  # Pause to show feedback before refreshing
+                elif choice == '8':
+                    # Filter expression, e.g. name~^py rss>500M cpu>=5
+                    expression = input(f"{CYAN}Filter expression (empty to clear): {RESET}").strip()
+                    try:
+                        if expression:
+                            compile_filter(expression)
+                        filter_by, filter_value = ("expr", expression) if expression else (None, None)
+                    except ValueError as e:
+                        print(f"{RED}{e}{RESET}")
+                        time.sleep(1)  # Pause to show feedback before refreshing
+                elif choice == '9':
+                    # Tree view; the index is built once and then kept up to date
+                    if tree is None:
+                        tree = ProcessTree()
+                        tree.update(snapshot)
+                        snapshot.listeners.append(tree.update)
+                    tree_view(snapshot, tree, refresh_interval)
+                    continue
+                elif choice == '10':
+                    # Aggregates are built once and then kept up to date
+                    if groups is None:
+                        groups = ProcessGroups()
+                        groups.update(snapshot)
+                        snapshot.listeners.append(groups.update)
+                    groups = group_view(snapshot, groups, sort_by, refresh_interval)
+                    continue
+                elif choice == '11':
+                    # Which process owns port X
+                    if not os.path.isdir("/proc/net"):
+                        print(f"{RED}The socket view needs /proc (Linux).{RESET}")
+                        time.sleep(1)  # Pause to show feedback before refreshing
+                        continue
+                    port = input(f"{CYAN}Port to look up (empty for all sockets): {RESET}").strip()
+                    if socket_map is None:
+                        socket_map = SocketMap()
+                    socket_view(snapshot, socket_map, refresh_interval, int(port) if port.isdigit() else None)
+                    continue
+                elif choice == '12':
+                    # Expensive columns, loaded lazily for visible rows only
+                    text = input(f"{CYAN}Columns ({', '.join(LAZY_COLUMNS)}; empty for none): {RESET}")
+                    try:
+                        lazy_columns.set_columns([c.strip() for c in text.split(",") if c.strip()])
+                    except ValueError as e:
+                        print(f"{RED}{e}{RESET}")
+                        time.sleep(1)  # Pause to show feedback before refreshing
+                elif choice == '13':
                     # Quit
                     print(f"{RED}Exiting...{RESET}")
                     sys.exit(0)